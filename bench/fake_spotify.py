@@ -0,0 +1,303 @@
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+# --- FAKE SPOTIFY ---
+# A local stand-in for the Web API endpoints BusTCurator uses, serving a synthetic library
+# built from a seed, with simulated latency and 429s. Run it on its own so its memory and
+# CPU stay out of the numbers: `python bench/fake_spotify.py --tracks 10000 --port 0`
+# prints "listening on http://127.0.0.1:<port>" once it's ready.
+GENRE_WORDS = ["indie", "dream", "synth", "lo-fi", "jazz", "hip", "hop", "post", "punk", "folk", "dark",
+               "wave", "soul", "house", "deep", "acid", "trap", "neo", "classic", "rock", "metal", "pop",
+               "bedroom", "garage", "ambient", "drill", "french", "k", "latin", "chamber", "emo", "city"]
+USER_ID = "benchuser"
+
+def spotify_id(kind, n):
+    # 22 characters like a real id, and readable when debugging.
+    return f"{kind}{n:0>{22 - len(kind)}}"
+
+class FakeLibrary:
+    def __init__(self, tracks=1000, seed=1, genres=600, tracks_per_artist=8, playlists=0):
+        rng = random.Random(seed)
+        self.rng = rng
+        self.lock = threading.Lock()
+        genre_names = set()
+        while len(genre_names) < genres:
+            genre_names.add(" ".join(rng.sample(GENRE_WORDS, rng.choice((1, 2, 2, 3)))))
+        genre_names = sorted(genre_names)
+        # A long tail: a few genres are everywhere, most are niche.
+        weights = [1 / (i + 1) for i in range(len(genre_names))]
+        n_artists = max(tracks // tracks_per_artist, 10)
+        self.artists = {}
+        for a in range(n_artists):
+            picks = set(rng.choices(genre_names, weights, k=rng.choice((0, 1, 2, 3, 3, 4))))
+            self.artists[spotify_id("ar", a)] = {"id": spotify_id("ar", a), "name": f"Artist {a}",
+                                                 "genres": sorted(picks)}
+        self.artist_ids = list(self.artists)
+        self.tracks = {}
+        self.saved = []   # newest first
+        for _ in range(tracks): self.add_saved()
+        self.playlists = {}
+        self.next_playlist = 0
+        # The user's own playlists: mostly songs they've liked, some they haven't.
+        for n in range(playlists):
+            pid = self.create_playlist(f"Playlist {n}", "")["id"]
+            size = rng.randint(20, 400)
+            liked = [item["track"]["uri"] for item in rng.sample(self.saved, min(int(size * 0.6), len(self.saved)))]
+            self.playlists[pid]["uris"] = liked + [self.make_track(len(self.tracks))["uri"] for _ in range(size - len(liked))]
+
+    def make_track(self, n):
+        artists = [self.rng.choice(self.artist_ids)] + ([self.rng.choice(self.artist_ids)] if self.rng.random() < 0.2 else [])
+        tid = spotify_id("tr", n)
+        self.tracks[tid] = {"id": tid, "uri": f"spotify:track:{tid}", "name": f"Track {n}",
+                            "artists": [{"id": a} for a in artists]}
+        return self.tracks[tid]
+
+    def add_saved(self, count=1):
+        # New saves go on top, the way Liked Songs orders them.
+        with self.lock:
+            for _ in range(count):
+                n = len(self.tracks)
+                added_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(1500000000 + n * 60))
+                self.saved.insert(0, {"added_at": added_at, "track": self.make_track(n)})
+
+    def features(self, tid):
+        # Stable per id, so repeated runs agree.
+        n = int(tid[2:]) if tid[2:].isdigit() else hash(tid)
+        r = random.Random(n)
+        return {"id": tid, "instrumentalness": r.random() ** 2, "energy": r.random(), "valence": r.random(),
+                "danceability": r.random(), "tempo": 60 + r.random() * 120}
+
+    def recommend(self, limit):
+        # Mostly tracks from outside the library, with some the user already has (as the real thing does).
+        with self.lock:
+            return [self.rng.choice(self.saved)["track"] if self.saved and self.rng.random() < 0.3
+                    else self.make_track(len(self.tracks)) for _ in range(limit)]
+
+    def create_playlist(self, name, description):
+        with self.lock:
+            pid = spotify_id("pl", self.next_playlist)
+            self.next_playlist += 1
+            self.playlists[pid] = {"id": pid, "name": name, "description": description, "owner": {"id": USER_ID},
+                                   "uris": [], "version": 0}
+        return self.playlist_summary(pid)
+
+    def playlist_summary(self, pid):
+        p = self.playlists[pid]
+        return {"id": pid, "name": p["name"], "description": p["description"], "owner": p["owner"],
+                "snapshot_id": f"{pid}-{p['version']}", "tracks": {"total": len(p["uris"])}}
+
+    def change(self, pid, edit):
+        with self.lock:
+            p = self.playlists[pid]
+            edit(p["uris"])
+            p["version"] += 1
+        return {"snapshot_id": f"{pid}-{p['version']}"}
+
+class Limiter:
+    # Server-side rate limit: past `rate` requests/second, answer 429 with Retry-After.
+    def __init__(self, rate, retry_after):
+        self.rate = rate
+        self.retry_after = retry_after
+        self.window = 0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        if not self.rate: return True
+        with self.lock:
+            now = int(time.monotonic())
+            if now != self.window: self.window, self.count = now, 0
+            self.count += 1
+            return self.count <= self.rate
+
+class FakeSpotify(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, library, latency=0.0, jitter=0.0, error_rate=0.0, rate=0, retry_after=1.0):
+        super().__init__(address, Handler)
+        self.library = library
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.limiter = Limiter(rate, retry_after)
+        self.stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.stats_lock: self.stats = {"calls": {}, "throttled": 0, "bytes_out": 0}
+
+    def count(self, endpoint, throttled=False, size=0):
+        with self.stats_lock:
+            self.stats["calls"][endpoint] = self.stats["calls"].get(endpoint, 0) + 1
+            self.stats["throttled"] += throttled
+            self.stats["bytes_out"] += size
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, like api.spotify.com
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self): self.handle_api("GET")
+    def do_POST(self): self.handle_api("POST")
+    def do_PUT(self): self.handle_api("PUT")
+    def do_DELETE(self): self.handle_api("DELETE")
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items(): self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+        return len(data)
+
+    def handle_api(self, method):
+        server = self.server
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"null") if length else None
+        parts = [p for p in url.path.split("/") if p]
+
+        if parts[:1] == ["__stats"]:
+            with server.stats_lock: stats = json.loads(json.dumps(server.stats))
+            if query.get("reset"): server.reset_stats()
+            return self.send_json(200, stats)
+        if parts[:1] == ["__add"]:
+            server.library.add_saved(int(query.get("n", 1)))
+            return self.send_json(200, {"total": len(server.library.saved)})
+
+        route = self.route(method, parts[1:])
+        endpoint = f"{method} {route[0] if route else url.path}"
+        if server.latency or server.jitter: time.sleep(server.latency + random.uniform(0, server.jitter))
+        if not server.limiter.allow() or random.random() < server.error_rate:
+            size = self.send_json(429, {"error": {"status": 429, "message": "API rate limit exceeded"}},
+                                  {"Retry-After": str(server.limiter.retry_after)})
+            return server.count(endpoint, throttled=True, size=size)
+        if not route:
+            size = self.send_json(404, {"error": {"status": 404, "message": "Not found"}})
+            return server.count(endpoint, size=size)
+        name, handler, args = route
+        try: status, result = 200, handler(query, body, *args)
+        except KeyError: status, result = 404, {"error": {"status": 404, "message": "Not found"}}
+        server.count(endpoint, size=self.send_json(status, result))
+
+    def route(self, method, parts):
+        # (endpoint name, handler, path args) for /v1/<parts>, or None.
+        n = len(parts)
+        if method == "GET":
+            if parts == ["me"]: return "me", self.me, ()
+            if parts == ["me", "tracks"]: return "me/tracks", self.saved_tracks, ()
+            if parts == ["me", "playlists"]: return "me/playlists", self.my_playlists, ()
+            if parts == ["artists"]: return "artists", self.artists, ()
+            if parts == ["audio-features"]: return "audio-features", self.audio_features, ()
+            if parts == ["recommendations"]: return "recommendations", self.recommendations, ()
+            if n == 2 and parts[0] == "playlists": return "playlists/{id}", self.playlist, (parts[1],)
+            if n == 3 and parts[0] == "playlists" and parts[2] == "tracks":
+                return "playlists/{id}/tracks", self.playlist_tracks, (parts[1],)
+        if method == "POST":
+            if n == 3 and parts[0] == "users" and parts[2] == "playlists": return "users/{id}/playlists", self.create, ()
+        if n == 3 and parts[0] == "playlists" and parts[2] == "tracks":
+            edit = {"POST": self.add_items, "PUT": self.replace_or_reorder, "DELETE": self.remove_items}.get(method)
+            if edit: return "playlists/{id}/tracks", edit, (parts[1],)
+        return None
+
+    def page(self, items, query, path, wrap=lambda item: item):
+        offset, limit = int(query.get("offset", 0)), int(query.get("limit", 20))
+        base = f"http://{self.headers.get('Host')}/v1/{path}"
+        nxt = f"{base}?offset={offset + limit}&limit={limit}" if offset + limit < len(items) else None
+        return {"href": f"{base}?offset={offset}&limit={limit}", "items": [wrap(i) for i in items[offset:offset + limit]],
+                "limit": limit, "offset": offset, "total": len(items), "next": nxt, "previous": None}
+
+    def me(self, query, body):
+        return {"id": USER_ID, "display_name": "Bench User"}
+
+    def saved_tracks(self, query, body):
+        return self.page(self.server.library.saved, query, "me/tracks")
+
+    def my_playlists(self, query, body):
+        library = self.server.library
+        return self.page(list(library.playlists), query, "me/playlists", library.playlist_summary)
+
+    def artists(self, query, body):
+        artists = self.server.library.artists
+        return {"artists": [artists.get(a) for a in query.get("ids", "").split(",") if a]}
+
+    def audio_features(self, query, body):
+        library = self.server.library
+        ids = [t for t in query.get("ids", "").split(",") if t]
+        return {"audio_features": [library.features(t) if t in library.tracks else None for t in ids]}
+
+    def recommendations(self, query, body):
+        tracks = self.server.library.recommend(min(int(query.get("limit", 20)), 100))
+        return {"tracks": tracks, "seeds": []}
+
+    def create(self, query, body):
+        return self.server.library.create_playlist(body.get("name"), body.get("description", ""))
+
+    def playlist(self, query, body, pid):
+        return self.server.library.playlist_summary(pid)
+
+    def playlist_tracks(self, query, body, pid):
+        library = self.server.library
+        def wrap(uri):
+            track = library.tracks.get(uri.rsplit(":", 1)[-1])
+            return {"added_at": None, "track": dict(track, type="track") if track else {"id": None, "uri": uri, "type": "track"}}
+        return self.page(list(library.playlists[pid]["uris"]), query, f"playlists/{pid}/tracks", wrap)
+
+    def add_items(self, query, body, pid):
+        uris = body["uris"] if isinstance(body, dict) else body
+        position = query.get("position")
+        def edit(current):
+            at = len(current) if position in (None, "") else int(position)
+            current[at:at] = uris
+        return self.server.library.change(pid, edit)
+
+    def replace_or_reorder(self, query, body, pid):
+        if "uris" in body:
+            def edit(current): current[:] = body["uris"]
+        else:
+            start, length, before = body["range_start"], body.get("range_length", 1), body["insert_before"]
+            def edit(current):
+                moved = current[start:start + length]
+                del current[start:start + length]
+                at = before - length if before > start else before
+                current[at:at] = moved
+        return self.server.library.change(pid, edit)
+
+    def remove_items(self, query, body, pid):
+        gone = {t["uri"] for t in body["tracks"]}
+        def edit(current): current[:] = [u for u in current if u not in gone]
+        return self.server.library.change(pid, edit)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local fake of the Spotify endpoints BusTCurator uses.")
+    parser.add_argument("--tracks", type=int, default=1000, help="saved tracks in the synthetic library")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--playlists", type=int, default=0, help="playlists the user already has")
+    parser.add_argument("--port", type=int, default=8765, help="0 picks a free port")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many extra seconds, at random")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--rate", type=int, default=0, help="requests per second before 429s (0 = no limit)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with a 429")
+    args = parser.parse_args(argv)
+
+    library = FakeLibrary(args.tracks, args.seed, playlists=args.playlists)
+    server = FakeSpotify(("127.0.0.1", args.port), library, args.latency, args.jitter, args.error_rate,
+                         args.rate, args.retry_after)
+    print(f"listening on http://127.0.0.1:{server.server_address[1]}", flush=True)
+    try: server.serve_forever()
+    except KeyboardInterrupt: pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
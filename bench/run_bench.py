@@ -0,0 +1,263 @@
+import argparse
+import heapq
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.request
+try: import resource   # Unix only; peak RSS is skipped elsewhere
+except ImportError: resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from store import LibraryStore
+from engine import CuratorEngine
+from scheduler import RequestScheduler, make_client, RATE, BURST
+from search import CheckList
+from display import UiDispatcher, genre_rows, format_stats
+from profiler import profiler
+
+# --- BENCHMARK SUITE ---
+# Runs scan, genre filtering and playlist builds against bench/fake_spotify.py in a separate
+# process, on a throwaway database, and reports for each step: wall time, API calls (as the
+# server saw them, plus 429s), peak Python memory, and how long the UI thread was stalled.
+# `python bench/run_bench.py --sizes 1000,10000 --latency 0.05 --json out.json`
+FAKE_SERVER = os.path.join(ROOT, "bench", "fake_spotify.py")
+QUERIES = ["i", "po", "roc", "indie", "dream pop", "hip hop", "post punk", "zzz", "k", "synth wave"]
+
+def percentile(values, pct):
+    if not values: return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+class FakeServer:
+    def __init__(self, tracks, args):
+        cmd = [sys.executable, FAKE_SERVER, "--tracks", str(tracks), "--port", "0", "--seed", str(args.seed),
+               "--latency", str(args.latency), "--jitter", str(args.jitter), "--error-rate", str(args.error_rate),
+               "--rate", str(args.server_rate), "--retry-after", str(args.retry_after),
+               "--playlists", str(args.playlists)]
+        self.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+        line = self.proc.stdout.readline().strip()
+        if not line.startswith("listening on "):
+            self.close()
+            raise RuntimeError(f"fake server didn't start: {line!r}")
+        self.url = line[len("listening on "):]
+
+    def get(self, path):
+        with urllib.request.urlopen(self.url + path) as response: return json.load(response)
+
+    def stats(self, reset=False):
+        return self.get("/__stats" + ("?reset=1" if reset else ""))
+
+    def close(self):
+        self.proc.terminate()
+        self.proc.wait()
+
+class HeadlessRoot:
+    # Just enough of Tk's after() to run the UiDispatcher on this thread, recording how late
+    # every callback starts and how long it holds the thread: together, the UI stall.
+    def __init__(self):
+        self.timers = []
+        self.seq = 0
+        self.late = []
+        self.busy = []
+
+    def after(self, ms, func):
+        self.seq += 1
+        heapq.heappush(self.timers, (time.perf_counter() + ms / 1000, self.seq, func))
+
+    def run_until(self, done):
+        while not done.is_set() or self.timers and self.timers[0][0] <= time.perf_counter():
+            due, _, func = heapq.heappop(self.timers)
+            wait = due - time.perf_counter()
+            if wait > 0: time.sleep(wait)
+            start = time.perf_counter()
+            self.late.append(start - due)
+            func()
+            self.busy.append(time.perf_counter() - start)
+
+    def stall(self):
+        frames = [late + busy for late, busy in zip(self.late, self.busy)]
+        return {"frames": len(frames), "stall_max_ms": round(max(frames, default=0) * 1000, 2),
+                "stall_p95_ms": round(percentile(frames, 95) * 1000, 2),
+                "handler_max_ms": round(max(self.busy, default=0) * 1000, 2)}
+
+class HeadlessWindow:
+    # Does the window's non-widget work for each engine event: the same list model, rows and
+    # stats text the real handlers build, minus the Tk calls.
+    def __init__(self, ui):
+        self.ui = ui
+        self.genre_list = CheckList()
+        self.stats = ""
+
+    def report(self, event, **data):
+        if event in ("status", "progress"): self.ui.post_latest(event, lambda **kw: None, **data)
+        elif event == "genres": self.ui.post_latest("genres", self.show_genre_counts, data["counts"], data["tracks"])
+
+    def show_genre_counts(self, counts, tracks):
+        self.genre_list.upsert(genre_rows(counts))
+        self.stats = format_stats(counts, tracks)
+
+    def show_scan_results(self, counts, tracks):
+        self.genre_list.clear()
+        self.genre_list.upsert(genre_rows(counts))
+        self.stats = format_stats(counts, tracks)
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.results = []
+
+    def measure(self, size, step, func, server=None, ui=False):
+        # Runs func (in a worker thread when ui=True, with the dispatcher pumping here) and records a result row.
+        if server: server.stats(reset=True)
+        profiler.reset(step)
+        if self.args.memory: tracemalloc.reset_peak()
+        calls_before = self.scheduler.calls if self.scheduler else 0
+        retries_before = self.scheduler.retries if self.scheduler else 0
+        start = time.perf_counter()
+        extra = {}
+        if ui:
+            root, done, error, result = HeadlessRoot(), threading.Event(), [], []
+            window = HeadlessWindow(UiDispatcher(root))
+            def work():
+                try: result.append(func(window) or {})
+                except Exception as e: error.append(e)
+                finally: done.set()
+            threading.Thread(target=work, daemon=True).start()
+            root.run_until(done)
+            if error: raise error[0]
+            extra = {**result[0], **root.stall()}
+        else: extra = func() or {}
+        row = {"size": size, "step": step, "wall_s": round(time.perf_counter() - start, 3)}
+        if server:
+            stats = server.stats()
+            row.update(api_calls=sum(stats["calls"].values()), throttled=stats["throttled"],
+                       bytes_in=stats["bytes_out"], client_calls=self.scheduler.calls - calls_before,
+                       retries=self.scheduler.retries - retries_before)
+            summary = profiler.summary()
+            row.update(network_s=summary["network_s"], rate_limited_s=summary["rate_limited_s"])
+        if self.args.memory: row["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        row.update(extra)
+        self.results.append(row)
+        print(format_row(row), flush=True)
+        return row
+
+    def run_size(self, size):
+        server = FakeServer(size, self.args)
+        with tempfile.TemporaryDirectory() as tmp:
+            store = LibraryStore(os.path.join(tmp, "bench.db"))
+            try:
+                self.scheduler = RequestScheduler(rate=self.args.rate, burst=self.args.burst)
+                sp = make_client(None, self.scheduler, prefix=server.url + "/v1/")
+                engine = CuratorEngine(store).connect(sp)
+                self.run_steps(size, engine, server)
+            finally:
+                server.close()
+                store.close()
+
+    def run_steps(self, size, engine, server):
+        def scan(window, playlists=None):
+            result = engine.scan(report=window.report, playlists=playlists)
+            window.ui.post(window.show_scan_results, result["counts"], result["tracks"])
+        self.measure(size, "scan (cold)", scan, server, ui=True)
+        self.measure(size, "scan (warm)", scan, server, ui=True)
+        server.get(f"/__add?n={self.args.new_tracks}")
+        self.measure(size, f"scan (+{self.args.new_tracks} new)", scan, server, ui=True)
+        if self.args.playlists:
+            self.measure(size, "scan +playlists (cold)", lambda window: scan(window, "all"), server, ui=True)
+            self.measure(size, "scan +playlists (warm)", lambda window: scan(window, "all"), server, ui=True)
+        self.measure(size, "audio features", lambda: {"cached": engine.warm_features()}, server)
+
+        counts = {g: engine.library.counts[g] for g in engine.library.genres()}
+        rows = genre_rows(counts)
+        genre_list = CheckList()
+        def filter_genres():
+            timings = []
+            for _ in range(self.args.repeat):
+                for query in QUERIES:
+                    start = time.perf_counter()
+                    genre_list.filter(query)
+                    timings.append(time.perf_counter() - start)
+            return {"filter_p95_ms": round(percentile(timings, 95) * 1000, 3),
+                    "filter_max_ms": round(max(timings) * 1000, 3)}
+        def load_genres():
+            genre_list.upsert(rows)
+            return {"genres": len(rows)}
+        self.measure(size, "genre list load", load_genres)
+        self.measure(size, "genre filter", filter_genres)
+
+        rng = random.Random(self.args.seed)
+        top = sorted(counts, key=counts.get, reverse=True)
+        picks = [rng.sample(top[:50], min(5, len(top))) for _ in range(self.args.repeat)]
+        def select():
+            timings = []
+            for genres in picks:
+                start = time.perf_counter()
+                tracks = engine.library.select(genres)
+                timings.append(time.perf_counter() - start)
+            return {"selected": len(tracks), "select_p95_ms": round(percentile(timings, 95) * 1000, 3)}
+        self.measure(size, "genre select", select)
+
+        genres = picks[0]
+        def build(name, **kwargs):
+            def run(window):
+                before = engine.discovery.stats()
+                result = engine.build(name, genres, spice=self.args.spice, report=window.report, **kwargs)
+                plan = result["plan"]
+                after = engine.discovery.stats()
+                return {"mode": result["mode"], "tracks": result["tracks"],
+                        "rec_calls": after["misses"] - before["misses"], "rec_cached": after["hits"] - before["hits"],
+                        **({"plan": "rewrite" if plan.rewrite else f"{len(plan.removes)}-/{len(plan.adds)}+/{len(plan.moves)}~"}
+                           if plan else {})}
+            return run
+        self.measure(size, "build (create)", build("Bench Mix"), server, ui=True)
+        self.measure(size, "build (read mode)", build("Bench Mix Instrumental", only_instrumental=True), server, ui=True)
+        self.measure(size, "build (sync)", build("Bench Mix", sync=True), server, ui=True)
+
+def format_row(row):
+    fixed = ("size", "step", "wall_s")
+    return f"{row['size']:>7} {row['step']:<24} {row['wall_s']:>8.3f}s  " + \
+        " ".join(f"{k}={v}" for k, v in row.items() if k not in fixed)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark scan, genre filtering and builds against a fake Spotify.")
+    parser.add_argument("--sizes", default="1000,10000", help="comma-separated library sizes, up to 100000")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds of simulated network latency per request")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--server-rate", type=int, default=0, help="server-side limit in requests/second (0 = none)")
+    parser.add_argument("--retry-after", type=float, default=0.5)
+    parser.add_argument("--rate", type=float, default=RATE, help="ceiling on the client request rate (default: the app's)")
+    parser.add_argument("--burst", type=int, default=BURST)
+    parser.add_argument("--spice", type=int, default=20)
+    parser.add_argument("--playlists", type=int, default=20, help="playlists the fake user has (scanned with and without)")
+    parser.add_argument("--new-tracks", type=int, default=120, help="saves added before the incremental rescan")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="skip tracemalloc (it slows Python code down noticeably)")
+    parser.add_argument("--json", help="also write the results here")
+    args = parser.parse_args(argv)
+
+    logging.getLogger("spotipy").setLevel(logging.CRITICAL)   # the 429s are expected here
+    if args.memory: tracemalloc.start()
+    bench = Bench(args)
+    for size in (int(s) for s in args.sizes.split(",") if s):
+        bench.run_size(size)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None
+    if rss: print(f"peak RSS {rss:.1f} MB")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "peak_rss_mb": rss and round(rss, 1), "results": bench.results}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import sys
+import time
+from fetcher import CancelToken, Cancelled
+from engine import CuratorEngine, MIN_GENRE_TRACKS
+from profiler import profiler
+
+# --- HEADLESS MODE ---
+# Runs scan/create without a display and writes one JSON object per line (NDJSON) to stdout,
+# so scheduled jobs can follow progress or pipe the output into other tools. Runs that talk to
+# Spotify end with a "profile" event (where the time went); --trace also saves a Chrome trace.
+def emit(event, **data):
+    sys.stdout.write(json.dumps({"event": event, "time": round(time.time(), 3), **data}) + "\n")
+    sys.stdout.flush()
+
+def report(event, **data):
+    # Live genre counts are a whole dict; on the command line a summary is enough.
+    if event == "genres": emit("genres", genres=len(data["counts"]), tracks=data["tracks"])
+    else: emit(event, **data)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="app.py", description="BusTCurator without the window.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--trace", metavar="PATH", help="Save a Chrome trace (chrome://tracing, ui.perfetto.dev) of the run")
+    sources = argparse.ArgumentParser(add_help=False)
+    sources.add_argument("--all-playlists", action="store_true", help="Also scan every playlist you have")
+    sources.add_argument("--playlist", action="append", metavar="NAME_OR_ID", help="Also scan this playlist (repeatable)")
+    commands.add_parser("scan", parents=[common, sources], help="Scan Liked Songs (and playlists) into the local library")
+
+    genres = commands.add_parser("genres", help="List genres from the last scan (no API calls)")
+    genres.add_argument("--min", type=int, default=MIN_GENRE_TRACKS, help="Only genres with at least this many songs")
+
+    create = commands.add_parser("create", parents=[common, sources], help="Build a mix from the last scan")
+    create.add_argument("--name", required=True, help="Playlist name")
+    create.add_argument("--genre", action="append", required=True, help="Genre to include (repeatable)")
+    create.add_argument("--spice", type=float, default=0, help="Discovery spice, 0-100")
+    create.add_argument("--no-lyrics", action="store_true", help="Read Mode: instrumental tracks only")
+    create.add_argument("--update-existing", action="store_true", help="Sync into the playlist with this name if it exists")
+    create.add_argument("--scan", action="store_true", help="Rescan the library first")
+    return parser.parse_args(argv)
+
+def main(argv):
+    args = parse_args(argv)
+    engine = CuratorEngine()
+    cancel = CancelToken()
+    profiler.reset(args.command)
+    try:
+        if args.command == "genres":
+            library = engine.load_library()
+            for genre in library.genres():
+                if library.counts[genre] >= args.min: emit("genre", name=genre, count=library.counts[genre])
+            return 0
+
+        if not os.getenv("SPOTIPY_CLIENT_ID") or not os.getenv("SPOTIPY_CLIENT_SECRET"):
+            emit("error", message="Spotify keys missing. Run the app once with a display, or fill in .env.")
+            return 2
+        engine.connect()
+
+        if args.command == "scan" or args.scan:
+            result = engine.scan(cancel, report, "all" if args.all_playlists else args.playlist)
+            emit("scanned", tracks=result["tracks"], genres=len(result["counts"]), sources=result["sources"],
+                 genre_cache=result["genre_cache"])
+            engine.warm_features(cancel, report)
+        else: engine.load_library()
+
+        if args.command == "create":
+            result = engine.build(args.name, args.genre, args.spice, args.no_lyrics, args.update_existing, cancel, report)
+            plan = result.pop("plan")
+            if plan: result.update(adds=len(plan.adds), removes=len(plan.removes), moves=len(plan.moves), rewrite=plan.rewrite)
+            emit("built", name=args.name, **result)
+            if result["mode"] == "empty": return 1
+        emit("done")
+        return 0
+    except (Cancelled, KeyboardInterrupt):
+        cancel.cancel()
+        emit("error", message="Interrupted.")
+        return 130
+    except Exception as e:
+        profiler.mark("error", str(e))
+        emit("error", message=str(e))
+        return 1
+    finally:
+        if engine.sp: emit("profile", **profiler.summary())
+        if getattr(args, "trace", None): profiler.export(args.trace)
@@ -0,0 +1,100 @@
+import math
+import os
+import random
+import threading
+from itertools import islice
+from fetcher import Cancelled
+from profiler import profiler
+
+# --- DISCOVERY ENGINE ---
+# Spice is spread over many small seed groups (up to 5 tracks from one selected genre each),
+# asked for in parallel waves sized by how many new tracks each call has been yielding, until
+# the mix has as many discoveries as the spice asks for. Anything already in the library (or
+# already picked) is skipped with a set lookup. Each group's results are cached in the store,
+# and groups are drawn in the same order for the same genres, so rebuilding a mix is mostly local.
+DISCOVERY_TTL_DAYS = float(os.getenv("BUSTCURATOR_DISCOVERY_TTL_DAYS", "7"))
+SEEDS_PER_GROUP = 5      # Spotify's limit for recommendation seeds
+RECS_PER_CALL = 100      # and for results per call
+MAX_CALLS = 200          # seed groups tried per build, cached ones included
+
+def group_key(seeds, min_instrumentalness):
+    return ",".join(sorted(seeds)) + f"|{min_instrumentalness or ''}"
+
+class Discovery:
+    def __init__(self, store, fetcher, ttl_days=DISCOVERY_TTL_DAYS):
+        self.store = store
+        self.fetcher = fetcher
+        self.ttl = ttl_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+        self.lock = threading.Lock()
+
+    def seed_groups(self, genres, library, allowed=None):
+        # Round-robin over the genres, each group from one genre so its recommendations stay on style.
+        # A track seeds at most one group. The shuffle is seeded by the genres, so the same mix draws
+        # the same groups (and hits the cache) next time.
+        rng = random.Random("|".join(sorted(genres)))
+        used = set()
+        pools = []
+        for genre in genres:
+            pool = [t for t in library.select([genre]) if (allowed is None or t in allowed) and not t.startswith("spotify:")]
+            rng.shuffle(pool)
+            pools.append(pool)
+        while any(pools):
+            for pool in pools:
+                group = []
+                while pool and len(group) < SEEDS_PER_GROUP:
+                    track_id = pool.pop()
+                    if track_id not in used:
+                        used.add(track_id)
+                        group.append(track_id)
+                if group: yield group
+
+    def fetch(self, seeds, min_instrumentalness):
+        # Track ids recommended for one group, or None when the call failed (the rest carry on).
+        try: return self.fetcher.recommendations(seeds, RECS_PER_CALL, min_instrumentalness)
+        except Cancelled: raise
+        except Exception as e:
+            with self.lock: self.failures += 1
+            profiler.mark("warning", f"Discovery error: {e}")
+            return None
+
+    def discover(self, genres, library, target, allowed=None, min_instrumentalness=None, on_progress=None, cancel=None):
+        # Up to `target` track ids the library doesn't have yet, in discovery order.
+        owned = self.store.track_ids()
+        found, picked = [], set()
+        groups = self.seed_groups(genres, library, allowed)
+        per_call = RECS_PER_CALL / 2   # new tracks per group, re-estimated after every wave
+        calls = 0
+        while len(found) < target and calls < MAX_CALLS:
+            if cancel: cancel.check()
+            wave_size = min(self.fetcher.workers * 2, MAX_CALLS - calls, math.ceil((target - len(found)) / max(per_call, 1)))
+            wave = list(islice(groups, max(wave_size, 1)))
+            if not wave: break
+            keys = [group_key(group, min_instrumentalness) for group in wave]
+            results = self.store.recommendations(keys, max_age=self.ttl)
+            misses = [(key, group) for key, group in zip(keys, wave) if key not in results]
+            with self.lock:
+                self.hits += len(wave) - len(misses)
+                self.misses += len(misses)
+            fetched = self.fetcher.run_ordered(lambda group: self.fetch(group, min_instrumentalness),
+                                               [group for _, group in misses], cancel=cancel)
+            fresh = {key: tracks for (key, _), tracks in zip(misses, fetched) if tracks is not None}
+            self.store.save_recommendations(fresh)
+            results.update(fresh)
+
+            before = len(found)
+            for key in keys:
+                for track_id in results.get(key, ()):
+                    if track_id in owned or track_id in picked: continue
+                    picked.add(track_id)
+                    found.append(track_id)
+            calls += len(wave)
+            per_call = (len(found) - before) / len(wave)
+            if on_progress: on_progress(min(len(found), target), target)
+            if misses and not fresh: break   # every call failed; keep what we have rather than hammer it
+        return found[:target]
+
+    def stats(self):
+        with self.lock: return {"hits": self.hits, "misses": self.misses, "failures": self.failures}
@@ -0,0 +1,57 @@
+import queue
+import threading
+import time
+from engine import MIN_GENRE_TRACKS
+from profiler import profiler, STALL_MS
+
+# --- DISPLAY HELPERS ---
+# The parts of the window that don't need Tk itself (text for the genre list and stats, and the
+# main-thread dispatcher, which only needs a root with after()), so the benchmark can drive them headless.
+def genre_rows(counts):
+    return [(f"{g.title()} ({c})", g, g) for g, c in sorted(counts.items()) if c >= MIN_GENRE_TRACKS]
+
+def format_stats(counts, total_songs):
+    top_15 = sorted(((g, c) for g, c in counts.items() if c >= MIN_GENRE_TRACKS), key=lambda x: x[1], reverse=True)[:15]
+    stats = f"Total Songs Scanned: {total_songs}\nUnique Genres Found: {len(counts)}\n\n--- TOP GENRES ---\n"
+    return stats + "".join(f"• {g.title()} ({c} songs)\n" for g, c in top_15)
+
+# --- UI DISPATCHER ---
+# Tk is not thread-safe, so worker threads never touch widgets. They post here and the main
+# thread drains the queue once per frame; keyed updates (status, progress) keep only the latest.
+class UiDispatcher:
+    FRAME_MS = 33
+
+    def __init__(self, root):
+        self.root = root
+        self.calls = queue.SimpleQueue()
+        self.latest = {}
+        self.lock = threading.Lock()
+        self.due = time.perf_counter() + self.FRAME_MS / 1000
+        self.root.after(self.FRAME_MS, self.pump)
+
+    def post(self, func, *args, **kwargs):
+        self.calls.put((func, args, kwargs))
+
+    def post_latest(self, key, func, *args, **kwargs):
+        with self.lock: self.latest[key] = (func, args, kwargs)
+
+    def pump(self):
+        # Each frame also tells the profiler how late it started (the main loop was busy elsewhere)
+        # and how long the handlers held the thread.
+        start = time.perf_counter()
+        with self.lock: latest, self.latest = self.latest, {}
+        pending = list(latest.values())
+        while True:
+            try: pending.append(self.calls.get_nowait())
+            except queue.Empty: break
+        for func, args, kwargs in pending:
+            try: func(*args, **kwargs)
+            except Exception as e:
+                profiler.mark("ui error", str(e))
+                print(f"UI update error: {e}")
+        end = time.perf_counter()
+        profiler.count("ui frames")
+        if end - self.due > STALL_MS / 1000: profiler.record("ui stall", "ui", self.due, end - self.due,
+                                                             {"late_ms": round((start - self.due) * 1000, 1)})
+        self.due = end + self.FRAME_MS / 1000
+        self.root.after(self.FRAME_MS, self.pump)
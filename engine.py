@@ -0,0 +1,334 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from store import LibraryStore, track_row, LIKED
+from fetcher import PagedFetcher, CancelToken, Cancelled, cancelling, PLAYLIST_PAGE_SIZE
+from genre_cache import GenreCache
+from feature_cache import FeatureCache
+from library import LibraryModel
+from pipeline import ScanPipeline
+from sync import PlaylistSync
+from discovery import Discovery
+from profiler import profiler
+
+# --- CURATOR ENGINE ---
+# Scan, curate and build without any GUI. Progress goes out through report(event, **data):
+# "status" (text), "progress" (value 0-1), "warning" (message, for non-fatal failures) and
+# "genres" (live counts, tracks) during a scan. Warnings are also kept by the profiler, and every
+# step runs inside a profiler span. The window and the command line are just different report() handlers.
+SCOPE = "user-library-read playlist-modify-public playlist-read-private"
+MIN_GENRE_TRACKS = 3
+CHECKPOINT_SECONDS = 1.0   # how often a full pass saves which pages it has (each page's tracks are saved at once)
+WRITE_BATCH = 100
+MIX_DESCRIPTION = "Curated by BusTCurator."   # our own mixes are never scanned back in as a source
+
+def no_report(event, **data):
+    pass
+
+class CuratorEngine:
+    def __init__(self, store=None):
+        self.store = store or LibraryStore()
+        self.sp = None
+        self.user_id = None
+        self.library = LibraryModel()
+
+    def connect(self, sp=None):
+        # sp: an already-built client (anything spotipy.Spotify-shaped); by default we log in with OAuth.
+        # The HTTP stack is imported here rather than at the top so offline commands start instantly.
+        if sp is None:
+            from spotipy.oauth2 import SpotifyOAuth
+            from scheduler import make_client
+            sp = make_client(SpotifyOAuth(scope=SCOPE, open_browser=False))
+        self.sp = sp
+        self.user_id = self.sp.current_user()['id']
+        self.fetcher = PagedFetcher(self.sp)
+        self.genre_cache = GenreCache(self.store, self.fetcher)
+        self.feature_cache = FeatureCache(self.store, self.fetcher)
+        self.playlist_sync = PlaylistSync(self.sp, self.fetcher, self.store)
+        self.discovery = Discovery(self.store, self.fetcher)
+        return self
+
+    def sync_saved_tracks(self, cancel, report=no_report, on_rows=None):
+        # Saved tracks come back newest-first, so we only page until we hit a track we already know.
+        # Every page is saved and handed to on_rows as soon as it arrives.
+        on_rows = on_rows or (lambda rows: None)
+        known = self.store.track_count(LIKED)
+        results = self.sp.current_user_saved_tracks(limit=50)
+        total = results['total']
+        top = track_row(results['items'][0]) if results['items'] else None
+        head = [top[0], top[1]] if top else None
+        new_rows = []
+        caught_up = not known
+        while not caught_up:
+            page_rows = []
+            for item in results['items']:
+                row = track_row(item)
+                if not row: continue
+                if self.store.added_at(row[0]) == row[1]:
+                    caught_up = True
+                    break
+                page_rows.append(row)
+            self.store.upsert_tracks(page_rows)
+            on_rows(page_rows)
+            new_rows.extend(page_rows)
+            if caught_up or not results['next']: break
+            cancel.check()
+            report("status", text=f"Fetching new songs... {len(new_rows)}")
+            results = self.sp.next(results)
+
+        # Cheap removal check: if the counts disagree (or this is the first scan) pull everything in parallel.
+        if self.store.track_count(LIKED) != total:
+            self.full_pass(total, head, None if known else results, cancel, report, on_rows)
+            return max(self.store.track_count(LIKED) - known, 0)
+        return len(new_rows)
+
+    def full_pass(self, total, head, first, cancel, report, on_rows):
+        # Checkpointed: the pages already saved are kept in the "scan" checkpoint, so if this pass is
+        # stopped or crashes, the next one skips them, as long as Liked Songs hasn't changed meanwhile
+        # (same total, same newest track). Tracks it sees are marked in the store, and whatever
+        # wasn't seen by the end has been removed from the library.
+        state, _ = self.store.checkpoint("scan")
+        if state and state["total"] == total and state["head"] == head:
+            done = set(state["offsets"])
+            report("status", text=f"Resuming your library scan ({len(done)} pages already saved)...")
+        else:
+            done = set()
+            self.store.clear_seen()
+            report("status", text="Fetching your whole library...")
+        saved_at = time.monotonic()
+        def save_checkpoint():
+            self.store.save_checkpoint("scan", {"total": total, "head": head, "offsets": sorted(done)})
+        def save_page(items, offset):
+            nonlocal saved_at
+            rows = [r for r in map(track_row, items) if r]
+            self.store.upsert_tracks(rows)
+            self.store.mark_seen(r[0] for r in rows)
+            on_rows(rows)
+            done.add(offset)
+            if time.monotonic() - saved_at >= CHECKPOINT_SECONDS:
+                save_checkpoint()
+                saved_at = time.monotonic()
+        try:
+            self.fetcher.saved_tracks(on_progress=lambda n_done, n: report("progress", value=n_done / n),
+                                      first=first, cancel=cancel, on_page=save_page, skip=done)
+        except BaseException:
+            save_checkpoint()
+            raise
+        self.store.remove_unseen()
+        self.store.clear_checkpoint("scan")
+
+    def find_playlists(self, playlists, cancel=None, report=no_report):
+        # The user's playlists (followed ones too) to scan: "all", or a list of names/ids. Our own mixes are left out.
+        found = [p for p in self.fetcher.playlists(cancel=cancel)
+                 if p and not (p.get('description') or '').startswith(MIX_DESCRIPTION)]
+        if playlists == "all": return found
+        wanted = set(playlists)
+        selected = [p for p in found if p['id'] in wanted or p['name'] in wanted]
+        matched = {p['id'] for p in selected} | {p['name'] for p in selected}
+        for name in playlists:
+            if name not in matched: self.warn(report, f"No playlist named or with id '{name}'; skipped.")
+        return selected
+
+    def sync_playlists(self, playlists, cancel, report=no_report, on_rows=None):
+        # Playlists whose snapshot_id hasn't moved since the last scan are skipped outright. Every page
+        # of the changed ones is known from the listing's totals, so they all go through one pool
+        # together; a playlist's tracks replace its old ones once all its pages are in.
+        on_rows = on_rows or (lambda rows: None)
+        known = self.store.sources()
+        changed = [p for p in playlists if p['id'] not in known or known[p['id']][1] != p['snapshot_id']]
+        report("status", text=f"Reading {len(changed)} changed playlists ({len(playlists) - len(changed)} unchanged)...")
+        pending = {p['id']: [p, [], 0] for p in changed}   # id -> [playlist, rows, pages left]
+        jobs = []
+        for p in changed:
+            offsets = range(0, (p.get('tracks') or {}).get('total', 0), PLAYLIST_PAGE_SIZE)
+            pending[p['id']][2] = len(offsets)
+            jobs.extend((p['id'], offset) for offset in offsets)
+            if not offsets: self.store.replace_source(p['id'], p['name'], p['snapshot_id'], [])
+        def save_page(result):
+            pid, page = result
+            rows = [r for r in map(track_row, page['items']) if r]
+            on_rows(rows)
+            entry = pending[pid]
+            entry[1].extend(rows)
+            entry[2] -= 1
+            if not entry[2]: self.store.replace_source(pid, entry[0]['name'], entry[0]['snapshot_id'], entry[1])
+        self.fetcher.run_ordered(lambda job: (job[0], self.fetcher.playlist_page(*job)), jobs,
+                                 on_progress=lambda done, n: report("status", text=f"Reading playlists... {done}/{n} pages"),
+                                 cancel=cancel, on_result=save_page)
+        return len(changed)
+
+    def scan(self, cancel=None, report=no_report, playlists=None):
+        # playlists: None for Liked Songs only, "all", or a list of playlist names/ids to scan alongside it.
+        # Returns {"library", "counts", "tracks", "sources", "genre_cache"}; self.library is updated as well.
+        # Every request it makes runs under cancel, so a Stop also cuts short rate-limit waits and retries.
+        cancel = cancel or CancelToken()
+        with cancelling(cancel): return self.run_scan(cancel, report, playlists)
+
+    def run_scan(self, cancel, report, playlists):
+        report("status", text="Fetching your vibes...")
+        selected = []
+        if playlists:
+            with profiler.span("list playlists"): selected = self.find_playlists(playlists, cancel, report)
+            if playlists == "all":
+                listed = {p['id'] for p in selected}
+                for sid in self.store.sources():
+                    if sid != LIKED and sid not in listed: self.store.remove_source(sid)
+        self.store.set_active_sources(p['id'] for p in selected)
+
+        pipeline = ScanPipeline(self.genre_cache, cancel=cancel,
+                                on_update=lambda counts, tracks: report("genres", counts=counts, tracks=tracks))
+        pool = ThreadPoolExecutor(max_workers=1)
+        try:
+            # Whatever we already know shows up straight from the cache while new pages stream in behind it.
+            pipeline.start()
+            pipeline.feed((t, aid) for aid, tracks in self.store.primary_artists().items() for t in tracks)
+            # Playlists are read on their own thread while Liked Songs syncs here; the pipeline dedupes both.
+            def read_playlists():
+                with cancelling(cancel), profiler.span("sync playlists"):
+                    return self.sync_playlists(selected, cancel, report, pipeline.feed_rows)
+            playlists_done = pool.submit(read_playlists) if selected else None
+            try:
+                with profiler.span("sync saved tracks"): self.sync_saved_tracks(cancel, report, on_rows=pipeline.feed_rows)
+            except BaseException:
+                cancel.cancel()
+                raise
+            if playlists_done: playlists_done.result()
+            report("status", text="Analyzing artists...")
+            with profiler.span("resolve artists"): artist_genres = pipeline.finish()
+        finally:
+            pool.shutdown(wait=True)
+            if pipeline.thread.is_alive():
+                cancel.cancel()
+                pipeline.queue.put(None)
+
+        # The store is the final word (it knows about removals), so build the exact model from it.
+        with profiler.span("build library model"):
+            self.library = LibraryModel.build(self.store.primary_artists(), artist_genres)
+        return {"library": self.library, "counts": {g: self.library.counts[g] for g in self.library.genres()},
+                "tracks": self.store.track_count(), "sources": self.store.source_counts(),
+                "genre_cache": self.genre_cache.stats()}
+
+    def warm_features(self, cancel=None, report=no_report):
+        # Fills the audio-features cache so Read Mode builds are local lookups. Failures aren't fatal.
+        def feature_progress(done, n):
+            report("progress", value=done / n)
+            report("status", text=f"Caching audio features {done}/{n}...")
+        try:
+            with profiler.span("warm audio features"): return self.feature_cache.warm(on_progress=feature_progress, cancel=cancel)
+        except Cancelled: raise
+        except Exception as e:
+            self.warn(report, f"Audio features error: {e}")
+            return 0
+
+    def warn(self, report, message):
+        profiler.mark("warning", message)
+        report("warning", message=message)
+
+    def load_library(self):
+        # Builds the model from what's already on disk, without touching the API.
+        artist_to_tracks = self.store.primary_artists()
+        artist_genres = {aid: genres for aid, (genres, _) in self.store.artist_genres(list(artist_to_tracks)).items()}
+        self.library = LibraryModel.build(artist_to_tracks, artist_genres)
+        return self.library
+
+    def curate(self, genres, spice=0, only_instrumental=False, cancel=None, report=no_report):
+        # The shuffled track list for a mix: selected genres, optionally vocal-free, plus spice.
+        cancel = cancel or CancelToken()
+        report("status", text="Curating songs...")
+        with profiler.span("select genres"): final_track_ids = self.library.select(genres)
+
+        if only_instrumental:
+            report("status", text="Filtering vocals...")
+            with profiler.span("audio feature lookup", tracks=len(final_track_ids)):
+                final_track_ids = self.feature_cache.filter(final_track_ids, instrumentalness=0.5, cancel=cancel,
+                                                            on_progress=lambda done, n: report("progress", value=done / n))
+
+        target_new = int(len(final_track_ids) * (spice / 100))
+        if target_new > 0:
+            report("status", text="Adding Spice (Discovery)...")
+            failures = self.discovery.stats()["failures"]
+            def discovery_progress(done, n):
+                report("progress", value=done / n)
+                report("status", text=f"Adding Spice (Discovery)... {done}/{n}")
+            try:
+                with profiler.span("discovery", target=target_new):
+                    found = self.discovery.discover(genres, self.library, target_new, allowed=set(final_track_ids),
+                                                    min_instrumentalness=0.6 if only_instrumental else None,
+                                                    on_progress=discovery_progress, cancel=cancel)
+            except Cancelled: raise
+            except Exception as e:
+                self.warn(report, f"Discovery error: {e}")
+                found = []
+            if self.discovery.stats()["failures"] > failures:
+                self.warn(report, f"Some discovery requests failed; added {len(found)} of {target_new} new tracks.")
+            final_track_ids.extend(found)
+
+        random.shuffle(final_track_ids)
+        return final_track_ids
+
+    def build(self, name, genres, spice=0, only_instrumental=False, sync=False, cancel=None, report=no_report):
+        # Returns {"mode": "created" | "synced" | "empty", "tracks", "playlist_id", "plan"}; runs under cancel like scan.
+        cancel = cancel or CancelToken()
+        with cancelling(cancel): return self.run_build(name, genres, spice, only_instrumental, sync, cancel, report)
+
+    def run_build(self, name, genres, spice, only_instrumental, sync, cancel, report):
+        resumed = None if sync else self.resumable_build(name, genres, spice, only_instrumental, report)
+        final_track_ids = resumed[1] if resumed else self.curate(genres, spice, only_instrumental, cancel, report)
+        if not final_track_ids: return {"mode": "empty", "tracks": 0, "playlist_id": None, "plan": None}
+
+        cancel.check()
+        # Sync mode: if we already made this mix, only send what changed. A stopped sync needs no
+        # checkpoint: the next one diffs against whatever made it into the playlist.
+        playlist_id = None
+        if sync:
+            with profiler.span("find playlist"): playlist_id = self.playlist_sync.find(self.user_id, name, cancel=cancel)
+        if playlist_id:
+            report("status", text=f"Syncing '{name}'...")
+            with profiler.span("sync playlist"):
+                plan = self.playlist_sync.sync(playlist_id, final_track_ids, cancel=cancel,
+                                               on_progress=lambda done, n: report("progress", value=done / n))
+            return {"mode": "synced", "tracks": len(final_track_ids), "playlist_id": playlist_id, "plan": plan}
+
+        # A new playlist is checkpointed batch by batch ("build"), so a failed run can be finished off
+        # by running the same build again instead of leaving a half-filled duplicate.
+        state = {"name": name, "genres": genres, "spice": spice, "only_instrumental": only_instrumental}
+        if resumed:
+            playlist_id, committed = resumed[0], resumed[2]
+            report("status", text=f"Resuming '{name}' ({committed}/{len(final_track_ids)} tracks already added)...")
+        else:
+            report("status", text=f"Creating '{name}'...")
+            desc = f"{MIX_DESCRIPTION} {int(spice)}% Spice. Genres: {', '.join(genres[:3])}"
+            playlist_id = self.sp.user_playlist_create(self.user_id, name, public=True, description=desc)['id']
+            committed = 0
+            self.store.save_checkpoint("build", {**state, "playlist_id": playlist_id, "committed": 0}, final_track_ids)
+        snapshot_id = None
+        for i in range(committed, len(final_track_ids), WRITE_BATCH):
+            cancel.check()
+            with profiler.span("playlist write", "fetch", offset=i):
+                snapshot_id = self.sp.playlist_add_items(playlist_id, final_track_ids[i:i+WRITE_BATCH])['snapshot_id']
+            self.store.save_checkpoint("build", {**state, "playlist_id": playlist_id,
+                                                 "committed": min(i + WRITE_BATCH, len(final_track_ids))})
+            report("progress", value=i / len(final_track_ids))
+        # The playlist now holds exactly the mix, so the first Update Existing needn't read it back.
+        if snapshot_id: self.store.save_playlist_contents(playlist_id, snapshot_id, final_track_ids)
+        self.store.clear_checkpoint("build")
+        return {"mode": "created", "tracks": len(final_track_ids), "playlist_id": playlist_id, "plan": None}
+
+    def resumable_build(self, name, genres, spice, only_instrumental, report=no_report):
+        # (playlist_id, track ids, tracks already added) when the last build of this exact mix stopped
+        # partway, else None. The playlist's real length wins over the checkpoint, in case a batch
+        # went through just before the crash.
+        state, track_ids = self.store.checkpoint("build")
+        if not state or not track_ids: return None
+        if [state["name"], state["genres"], state["spice"], state["only_instrumental"]] != [name, list(genres), spice, only_instrumental]:
+            return None
+        try: total = self.sp.playlist(state["playlist_id"], fields="tracks.total")["tracks"]["total"]
+        except Exception as e:
+            self.warn(report, f"Can't resume '{name}', starting over: {e}")
+            self.store.clear_checkpoint("build")
+            return None
+        if total < state["committed"] or total > len(track_ids):
+            self.warn(report, f"'{name}' was changed since the last build stopped, starting over.")
+            self.store.clear_checkpoint("build")
+            return None
+        return state["playlist_id"], track_ids, total
@@ -0,0 +1,36 @@
+WARM_STEP = 1000  # tracks fetched (in parallel) between saves while warming
+
+# --- AUDIO FEATURES CACHE ---
+# A track's audio features never change, so once fetched the whole vector is kept in the
+# library store. Read Mode (and any other feature threshold) is then a local lookup.
+class FeatureCache:
+    def __init__(self, store, fetcher):
+        self.store = store
+        self.fetcher = fetcher
+
+    def get(self, track_ids, on_progress=None, cancel=None):
+        # {track_id: features or None}; only tracks we've never looked up go to the API, in parallel batches.
+        track_ids = list(track_ids)
+        found = self.store.audio_features(track_ids)
+        missing = [tid for tid in track_ids if tid not in found]
+        if missing:
+            fetched = self.fetcher.audio_features(missing, on_progress=on_progress, cancel=cancel)
+            self.store.save_audio_features(fetched)
+            found.update(fetched)
+        return found
+
+    def warm(self, on_progress=None, cancel=None):
+        # Fetches features for every library track that doesn't have them yet, saving as it goes
+        # so a stopped scan keeps whatever it already fetched.
+        missing = self.store.tracks_without_features()
+        for start in range(0, len(missing), WARM_STEP):
+            chunk = missing[start:start+WARM_STEP]
+            self.store.save_audio_features(self.fetcher.audio_features(chunk, cancel=cancel))
+            if on_progress: on_progress(start + len(chunk), len(missing))
+        return len(missing)
+
+    def filter(self, track_ids, on_progress=None, cancel=None, **minimums):
+        # Keeps tracks whose features meet every minimum, e.g. filter(ids, instrumentalness=0.5).
+        features = self.get(track_ids, on_progress=on_progress, cancel=cancel)
+        return [tid for tid in track_ids
+                if (f := features.get(tid)) and all((f.get(k) or 0) > v for k, v in minimums.items())]
@@ -0,0 +1,133 @@
+import os
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from profiler import profiler
+
+# --- PARALLEL FETCH ENGINE ---
+# The first page of any paged endpoint tells us `total`, so every other offset is known
+# up front and can be pulled through a bounded pool instead of chasing `next` links.
+WORKERS = int(os.getenv("BUSTCURATOR_WORKERS", "8"))
+PAGE_SIZE = 50
+ARTIST_BATCH = 50
+FEATURES_BATCH = 100
+PLAYLIST_PAGE_SIZE = 100
+
+class Cancelled(Exception):
+    pass
+
+class CancelToken:
+    # Handed to worker code so the UI can stop a running scan or build between requests.
+    def __init__(self):
+        self.event = threading.Event()
+
+    def cancel(self):
+        self.event.set()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def check(self):
+        if self.event.is_set(): raise Cancelled()
+
+# The token of the job running on this thread, so the scheduler can cut its waits short on Stop
+# without every API call having to carry it. run_ordered passes it on to its pool threads.
+current = threading.local()
+
+@contextmanager
+def cancelling(cancel):
+    previous = getattr(current, "cancel", None)
+    current.cancel = cancel
+    try: yield
+    finally: current.cancel = previous
+
+def current_cancel():
+    return getattr(current, "cancel", None)
+
+class PagedFetcher:
+    def __init__(self, sp, workers=WORKERS):
+        self.sp = sp
+        self.workers = max(1, workers)
+
+    def run_ordered(self, func, jobs, on_progress=None, cancel=None, on_result=None):
+        # Runs func over jobs in the pool and hands the results back in job order.
+        # on_result(result) sees each one as soon as it lands, for callers that stream.
+        jobs = list(jobs)
+        results = [None] * len(jobs)
+        if not jobs: return results
+        cancel = cancel or current_cancel()
+        def run(job):
+            if cancel: cancel.check()
+            with cancelling(cancel): return func(job)
+        pool = ThreadPoolExecutor(max_workers=min(self.workers, len(jobs)))
+        try:
+            futures = {pool.submit(run, job): i for i, job in enumerate(jobs)}
+            for done, future in enumerate(as_completed(futures), 1):
+                results[futures[future]] = future.result()
+                if on_result: on_result(results[futures[future]])
+                if on_progress: on_progress(done, len(jobs))
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        return results
+
+    def paged(self, fetch_page, on_progress=None, first=None, cancel=None, on_page=None, page_size=PAGE_SIZE,
+              label="page", skip=()):
+        # fetch_page(offset) -> Spotify paging object. Returns every item, in API order;
+        # on_page(items, offset) is also called per page in arrival order. Each page is a `label` span.
+        # Offsets in skip (pages a resumed job already has) aren't fetched, and their items aren't returned.
+        def fetch(offset):
+            with profiler.span(label, "fetch", offset=offset): return fetch_page(offset)
+        if first is None or first.get('offset', 0) != 0: first = fetch(0)
+        if on_page: on_page(first['items'], 0)
+        offsets = range(len(first['items']), first['total'], page_size) if first['items'] else []
+        offsets = [offset for offset in offsets if offset not in skip]
+        pages = self.run_ordered(fetch, offsets, on_progress, cancel,
+                                 on_result=(lambda page: on_page(page['items'], page['offset'])) if on_page else None)
+        items = list(first['items'])
+        for page in pages: items.extend(page['items'])
+        return items
+
+    def saved_tracks(self, on_progress=None, first=None, cancel=None, on_page=None, skip=()):
+        return self.paged(lambda offset: self.sp.current_user_saved_tracks(limit=PAGE_SIZE, offset=offset),
+                          on_progress, first, cancel, on_page, label="saved tracks page", skip=skip)
+
+    def artists(self, artist_ids, on_progress=None, cancel=None, on_batch=None):
+        # on_batch(artists) sees each batch as it lands, so callers can save as they go.
+        chunks = [artist_ids[i:i+ARTIST_BATCH] for i in range(0, len(artist_ids), ARTIST_BATCH)]
+        def fetch(chunk):
+            with profiler.span("artist batch", "fetch", size=len(chunk)): return self.sp.artists(chunk)['artists']
+        batches = self.run_ordered(fetch, chunks, on_progress, cancel, on_result=on_batch)
+        return [artist for batch in batches for artist in batch if artist]
+
+    def audio_features(self, track_ids, on_progress=None, cancel=None):
+        # {track_id: features or None}, keyed by the id we asked for.
+        chunks = [track_ids[i:i+FEATURES_BATCH] for i in range(0, len(track_ids), FEATURES_BATCH)]
+        def fetch(chunk):
+            with profiler.span("audio features batch", "fetch", size=len(chunk)):
+                return self.sp.audio_features(chunk) or [None] * len(chunk)
+        batches = self.run_ordered(fetch, chunks, on_progress, cancel)
+        return {tid: f for chunk, batch in zip(chunks, batches) for tid, f in zip(chunk, batch)}
+
+    def recommendations(self, seed_tracks, limit=100, min_instrumentalness=None):
+        # Track ids recommended for up to 5 seed tracks.
+        with profiler.span("recommendations batch", "fetch", seeds=len(seed_tracks)):
+            recs = self.sp.recommendations(seed_tracks=seed_tracks, limit=limit, min_instrumentalness=min_instrumentalness)
+        return [t['id'] for t in recs['tracks'] if t and t.get('id')]
+
+    def playlists(self, cancel=None):
+        return self.paged(lambda offset: self.sp.current_user_playlists(limit=PAGE_SIZE, offset=offset), cancel=cancel,
+                          label="playlists page")
+
+    def playlist_page(self, playlist_id, offset):
+        # One page of a playlist with everything a scan needs to index its tracks.
+        fields = "items(added_at,track(id,uri,name,type,artists(id))),total,offset"
+        with profiler.span("playlist page", "fetch", offset=offset):
+            return self.sp.playlist_items(playlist_id, fields=fields, limit=PLAYLIST_PAGE_SIZE, offset=offset,
+                                          additional_types=('track',))
+
+    def playlist_tracks(self, playlist_id, on_progress=None, cancel=None):
+        fields = "items(track(id,uri)),total,offset"
+        return self.paged(lambda offset: self.sp.playlist_items(playlist_id, fields=fields, limit=PLAYLIST_PAGE_SIZE,
+                                                                offset=offset, additional_types=('track',)),
+                          on_progress, cancel=cancel, page_size=PLAYLIST_PAGE_SIZE, label="playlist tracks page")
@@ -0,0 +1,62 @@
+import os
+import sys
+import threading
+import time
+from profiler import profiler
+
+# --- ARTIST GENRE CACHE ---
+# Genres barely move, so we keep them in the library store and only ask Spotify about artists
+# we've never seen. Entries past their TTL are still served, and refreshed in the background.
+GENRE_TTL_DAYS = float(os.getenv("BUSTCURATOR_GENRE_TTL_DAYS", "30"))
+
+class GenreCache:
+    def __init__(self, store, fetcher, ttl_days=GENRE_TTL_DAYS):
+        self.store = store
+        self.fetcher = fetcher
+        self.ttl = ttl_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.lock = threading.Lock()
+        self.refreshing = set()
+
+    def lookup(self, artist_ids, on_progress=None, cancel=None):
+        # Returns {artist_id: [genres]}; only never-seen artists block on the API.
+        artist_ids = list(artist_ids)
+        cached = self.store.artist_genres(artist_ids)
+        cutoff = time.time() - self.ttl
+        genres = {aid: g for aid, (g, _) in cached.items()}
+        missing = [aid for aid in artist_ids if aid not in cached]
+        expired = [aid for aid, (_, fetched_at) in cached.items() if fetched_at < cutoff]
+        with self.lock:
+            self.hits += len(cached) - len(expired)
+            self.stale += len(expired)
+            self.misses += len(missing)
+
+        if missing:
+            # Each batch is saved as it lands, so a scan that stops halfway keeps every artist it resolved.
+            fetched = self.fetcher.artists(missing, on_progress=on_progress, cancel=cancel,
+                                           on_batch=self.store.save_artist_genres)
+            for artist in fetched: genres[artist['id']] = artist.get('genres') or []
+        if expired: self.refresh_in_background(expired)
+        return genres
+
+    def refresh_in_background(self, artist_ids):
+        with self.lock:
+            artist_ids = [aid for aid in artist_ids if aid not in self.refreshing]
+            self.refreshing.update(artist_ids)
+        if not artist_ids: return
+
+        def refresh():
+            try: self.store.save_artist_genres(self.fetcher.artists(artist_ids))
+            except Exception as e:
+                # Background thread: stdout may be the CLI's NDJSON stream, so this goes to stderr.
+                profiler.mark("warning", f"Genre refresh error: {e}")
+                print(f"Genre refresh error: {e}", file=sys.stderr)
+            finally:
+                with self.lock: self.refreshing.difference_update(artist_ids)
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "stale": self.stale, "refreshing": len(self.refreshing)}
@@ -0,0 +1,608 @@
+import customtkinter as ctk
+from tkinter import messagebox, filedialog
+import threading
+import random
+import os
+import math
+import time
+import webbrowser
+from dotenv import load_dotenv
+from fetcher import CancelToken, Cancelled
+from search import CheckList
+from engine import CuratorEngine, MIN_GENRE_TRACKS
+from profiler import profiler
+from display import UiDispatcher, genre_rows, format_stats
+
+# --- CONFIGURATION & THEME ---
+COLORS = {
+    "bg": "#190a29",          
+    "frame": "#251036",       
+    "green": "#00ff9d",       
+    "purple": "#8a2be2",      
+    "pink": "#ff1493",        
+    "orange": "#ff7700",      
+    "yellow": "#ffdd00",      
+    "text": "#e0e0e0"         
+}
+
+# Low-cost render mode: stars move in a few speed bands by tag, the frame rate backs off when the
+# main thread is busy, and the animation pauses while hidden. Set BUSTCURATOR_PERF_MODE=0 for full quality.
+PERF_MODE = os.getenv("BUSTCURATOR_PERF_MODE", "1") != "0"
+
+# --- ANIMATED BACKGROUND (Reused for both windows) ---
+class GroovyBackground(ctk.CTkCanvas):
+    FRAME_MS = 50
+    MAX_FRAME_MS = 250
+    IDLE_POLL_MS = 500
+    FRAME_BUDGET_MS = 8      # main-thread time (or lateness) a frame may cost before we slow down
+    DISABLE_MS = 30          # frames this slow for this long mean the animation should just stop
+    DISABLE_AFTER_FRAMES = 20
+    STAR_BANDS = 3
+
+    def __init__(self, master, perf_mode=PERF_MODE, **kwargs):
+        super().__init__(master, highlightthickness=0, bg=COLORS["bg"], **kwargs)
+        self.width = 800
+        self.height = 900
+        self.stars = []
+        self.notes = []
+        self.perf_mode = perf_mode
+        self.interval = self.FRAME_MS
+        self.last_frame = time.perf_counter()
+        self.slow_frames = 0
+        self.busy = False
+        self.paused = False
+        self.obscured = False
+        self.disabled = False
+        self.bind("<Configure>", self.on_resize)
+        self.bind("<Visibility>", self.on_visibility)
+        
+        for _ in range(70): self.add_star()
+        for _ in range(5): self.add_note()
+        self.band_speeds = [0.2 + 0.6 * (b + 0.5) / self.STAR_BANDS for b in range(self.STAR_BANDS)]
+        self.animate()
+
+    def on_resize(self, event):
+        self.width = event.width
+        self.height = event.height
+
+    def on_visibility(self, event):
+        self.obscured = event.state == "VisibilityFullyObscured"
+
+    def set_busy(self, busy):
+        # Safe from any thread: it only flips a flag that the next frame reads.
+        self.busy = busy
+
+    def add_star(self):
+        x = random.randint(0, 1000)
+        y = random.randint(0, 1000)
+        size = random.randint(1, 3)
+        fill = random.choice(["#ffffff", "#aaaaaa", "#777777"])
+        speed = random.uniform(0.2, 0.8)
+        band = min(int((speed - 0.2) / 0.6 * self.STAR_BANDS), self.STAR_BANDS - 1)
+        star = self.create_oval(x, y, x+size, y+size, fill=fill, outline="", tags=(f"stars{band}",))
+        self.stars.append({"id": star, "speed": speed, "band": band, "y": y})
+
+    def add_note(self):
+        x = random.randint(50, 750)
+        y = random.randint(800, 900)
+        char = random.choice(["♪", "♫", "♩", "♬"])
+        color = random.choice([COLORS["green"], COLORS["pink"], COLORS["yellow"], COLORS["orange"]])
+        font_size = random.randint(20, 30)
+        note = self.create_text(x, y, text=char, fill=color, font=("Arial", font_size))
+        self.notes.append({"id": note, "speed": random.uniform(1, 3), "wobble": random.uniform(0, 100), "y": y})
+
+    def animate(self):
+        if not self.perf_mode: return self.animate_full()
+        now = time.perf_counter()
+        late_ms = (now - self.last_frame) * 1000 - self.interval
+        self.last_frame = now
+        if self.busy or self.obscured or not self.winfo_viewable():
+            self.paused = True
+            self.after(self.IDLE_POLL_MS, self.animate)
+            return
+        if self.paused:
+            # The idle poll's gap isn't lateness; start timing afresh.
+            self.paused = False
+            late_ms = 0
+
+        # Positions are tracked here, so a frame is a handful of tag moves plus the odd wrap.
+        step = self.interval / self.FRAME_MS
+        for band, speed in enumerate(self.band_speeds): self.move(f"stars{band}", 0, 0.2 * speed * step)
+        for s in self.stars:
+            s["y"] += 0.2 * self.band_speeds[s["band"]] * step
+            if s["y"] > self.height:
+                self.move(s["id"], 0, -self.height)
+                s["y"] -= self.height
+
+        for n in self.notes:
+            n["wobble"] += 0.1 * step
+            dy = -1 * n["speed"] * step
+            self.move(n["id"], math.sin(n["wobble"]) * 1.5 * step, dy)
+            n["y"] += dy
+            if n["y"] < -50:
+                self.move(n["id"], random.randint(-100, 100), self.height + 100)
+                n["y"] += self.height + 100
+
+        frame_ms = (time.perf_counter() - now) * 1000
+        self.slow_frames = self.slow_frames + 1 if frame_ms > self.DISABLE_MS else 0
+        if self.slow_frames >= self.DISABLE_AFTER_FRAMES:
+            self.disabled = True
+            return
+        if frame_ms > self.FRAME_BUDGET_MS or late_ms > self.FRAME_BUDGET_MS:
+            self.interval = min(self.MAX_FRAME_MS, int(self.interval * 1.5))
+        else: self.interval = max(self.FRAME_MS, self.interval - 5)
+        self.after(self.interval, self.animate)
+
+    def animate_full(self):
+        for s in self.stars:
+            self.move(s["id"], 0, 0.2 * s["speed"])
+            coords = self.coords(s["id"])
+            if coords and coords[1] > self.height:
+                self.move(s["id"], 0, -self.height)
+
+        for n in self.notes:
+            n["wobble"] += 0.1
+            dx = math.sin(n["wobble"]) * 1.5 
+            dy = -1 * n["speed"]
+            self.move(n["id"], dx, dy)
+            coords = self.coords(n["id"])
+            if coords and coords[1] < -50:
+                self.move(n["id"], random.randint(-100, 100), self.height + 100)
+        self.after(50, self.animate)
+
+# --- SETUP WIZARD (Runs if .env is missing) ---
+class SetupWizard(ctk.CTk):
+    def __init__(self):
+        super().__init__()
+        self.title("BusTCurator - First Run Setup")
+        self.geometry("600x500")
+        self.configure(fg_color=COLORS["bg"])
+        
+        self.bg_canvas = GroovyBackground(self, width=600, height=500)
+        self.bg_canvas.place(x=0, y=0, relwidth=1, relheight=1)
+
+        main_frame = ctk.CTkFrame(self, fg_color=COLORS["frame"], border_color=COLORS["green"], border_width=2)
+        main_frame.place(relx=0.5, rely=0.5, anchor="center", relwidth=0.85, relheight=0.85)
+
+        ctk.CTkLabel(main_frame, text="Welcome to BusTCurator!", font=("Rubik", 24, "bold"), text_color="white").pack(pady=(30, 10))
+        ctk.CTkLabel(main_frame, text="To get started, we need your Spotify API Keys.", text_color=COLORS["text"]).pack()
+
+        # Link Button
+        link_btn = ctk.CTkButton(main_frame, text="Click here to get keys (Spotify Dashboard)", 
+                                 command=self.open_spotify_dash, fg_color=COLORS["purple"], hover_color=COLORS["pink"])
+        link_btn.pack(pady=10)
+
+        ctk.CTkLabel(main_frame, text="(Create an App -> Settings -> Copy Client ID & Secret)", font=("Arial", 10), text_color="gray").pack()
+        
+        # Inputs
+        self.entry_id = ctk.CTkEntry(main_frame, placeholder_text="Paste Client ID here", width=300)
+        self.entry_id.pack(pady=(20, 10))
+        
+        self.entry_secret = ctk.CTkEntry(main_frame, placeholder_text="Paste Client Secret here", width=300, show="*")
+        self.entry_secret.pack(pady=(0, 20))
+
+        # Save Button
+        ctk.CTkButton(main_frame, text="Save & Launch", command=self.save_keys, 
+                      fg_color=COLORS["green"], text_color=COLORS["bg"], font=("Arial", 14, "bold")).pack(pady=20)
+        
+        self.success = False
+
+    def open_spotify_dash(self):
+        webbrowser.open("https://developer.spotify.com/dashboard")
+
+    def save_keys(self):
+        c_id = self.entry_id.get().strip()
+        c_secret = self.entry_secret.get().strip()
+        
+        if not c_id or not c_secret:
+            messagebox.showwarning("Missing Info", "Please paste both keys to continue.")
+            return
+            
+        # Write to .env
+        with open(".env", "w") as f:
+            f.write(f"SPOTIPY_CLIENT_ID={c_id}\n")
+            f.write(f"SPOTIPY_CLIENT_SECRET={c_secret}\n")
+            f.write("SPOTIPY_REDIRECT_URI=http://localhost:8080\n")
+            
+        messagebox.showinfo("Success", "Keys saved! Launching the app...")
+        self.success = True
+        self.destroy()
+
+# --- MAIN APP ---
+class ScrollableCheckBoxFrame(ctk.CTkFrame):
+    # Virtualized: only enough checkboxes for the visible rows exist, and scrolling just relabels them.
+    # Items, search and checked state live in a CheckList, so filtering and scrolling never lose
+    # a selection, and adding a value that exists just relabels it (live counts during a scan).
+    ROW_HEIGHT = 28
+    SEARCH_DELAY_MS = 150
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, fg_color=COLORS["frame"], **kwargs)
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+        self.rows_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.rows_frame.grid(row=0, column=0, sticky="nsew")
+        self.rows_frame.grid_propagate(False)
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.on_scrollbar, button_color=COLORS["purple"])
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.rows_frame.bind("<Configure>", self.on_resize)
+        self.bind_wheel(self.rows_frame)
+
+        self.rows = []
+        self.model = CheckList()
+        self.top = 0
+        self.page_size = 0
+        self.search_job = None
+
+    def bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", lambda e: self.scroll_by(-1 if e.delta > 0 else 1))
+        widget.bind("<Button-4>", lambda e: self.scroll_by(-1))
+        widget.bind("<Button-5>", lambda e: self.scroll_by(1))
+
+    def on_resize(self, event):
+        needed = max(1, int(event.height // self._apply_widget_scaling(self.ROW_HEIGHT)))
+        while len(self.rows) < needed:
+            pos = len(self.rows)
+            checkbox = ctk.CTkCheckBox(self.rows_frame, text="", text_color=COLORS["text"],
+                                       fg_color=COLORS["green"], hover_color=COLORS["pink"],
+                                       checkmark_color=COLORS["bg"], command=lambda pos=pos: self.on_toggle(pos))
+            self.bind_wheel(checkbox)
+            self.rows.append(checkbox)
+        self.page_size = needed
+        self.render()
+
+    def add_item(self, item_text, data_value, search_text=None):
+        self.add_items([(item_text, data_value, search_text)])
+
+    def add_items(self, items):
+        self.model.upsert(items)
+        self.scroll_by(0)
+
+    def filter_items(self, search_query):
+        # Debounced: a burst of keystrokes only runs the search once typing pauses.
+        if self.search_job: self.after_cancel(self.search_job)
+        self.search_job = self.after(self.SEARCH_DELAY_MS, lambda: self.apply_filter(search_query))
+
+    def apply_filter(self, search_query):
+        self.search_job = None
+        self.model.filter(search_query)
+        self.top = 0
+        self.render()
+
+    def scroll_by(self, rows):
+        self.top = max(0, min(self.top + rows, len(self.model.visible) - self.page_size))
+        self.render()
+
+    def on_scrollbar(self, *args):
+        if args[0] == "moveto": self.top = int(float(args[1]) * len(self.model.visible))
+        elif args[0] == "scroll": self.top += int(args[1]) * (self.page_size if args[2] == "pages" else 1)
+        self.scroll_by(0)
+
+    def on_toggle(self, row):
+        self.model.set_checked(self.model.visible_item(self.top + row)["value"], self.rows[row].get() == 1)
+
+    def render(self):
+        page = self.page_size
+        for row, checkbox in enumerate(self.rows):
+            pos = self.top + row
+            if row >= page or pos >= len(self.model.visible):
+                checkbox.grid_remove()
+                continue
+            item = self.model.visible_item(pos)
+            checkbox.configure(text=item["text"])
+            if item["value"] in self.model.checked: checkbox.select()
+            else: checkbox.deselect()
+            checkbox.grid(row=row, column=0, sticky="w", pady=2, padx=10)
+        total = max(len(self.model.visible), 1)
+        self.scrollbar.set(self.top / total, min(1.0, (self.top + page) / total))
+
+    def get_checked_values(self):
+        return self.model.checked_values()
+
+    def clear_all(self):
+        self.model.clear()
+        self.top = 0
+        self.render()
+
+class BusTCuratorApp(ctk.CTk):
+    def __init__(self):
+        super().__init__()
+        self.title("BusTCurator 🎵")
+        self.geometry("800x900")
+        ctk.set_appearance_mode("Dark")
+        self.configure(fg_color=COLORS["bg"])
+
+        self.bg_canvas = GroovyBackground(self, width=800, height=900)
+        self.bg_canvas.place(x=0, y=0, relwidth=1, relheight=1)
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        # Header
+        self.header_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.header_frame.grid(row=0, column=0, pady=(20, 10), sticky="ew")
+        ctk.CTkLabel(self.header_frame, text="BusTCurator", font=("Rubik", 32, "bold"), text_color="white").pack()
+        ctk.CTkLabel(self.header_frame, text="The Groovy Playlist Manager", font=("Arial", 14, "italic"), text_color=COLORS["green"]).pack()
+
+        # Tabs
+        self.tabview = ctk.CTkTabview(self, fg_color=COLORS["frame"], segmented_button_fg_color=COLORS["bg"],
+                                      segmented_button_selected_color=COLORS["green"], segmented_button_selected_hover_color=COLORS["pink"],
+                                      segmented_button_unselected_color=COLORS["frame"], text_color="white")
+        self.tabview.grid(row=1, column=0, padx=20, pady=10, sticky="nsew")
+        self.tab_curate = self.tabview.add("Curate & Discover")
+        self.tab_stats = self.tabview.add("Visual Stats")
+        
+        self.engine = CuratorEngine()
+        self.job = None
+        self.scanned = False
+        self.ui = UiDispatcher(self)
+        self.authenticate_spotify()
+        self.setup_curate_tab()
+        self.setup_stats_tab()
+
+        # Status Bar
+        self.status_bar_frame = ctk.CTkFrame(self, height=40, fg_color=COLORS["frame"], border_color=COLORS["green"], border_width=2)
+        self.status_bar_frame.grid(row=2, column=0, padx=20, pady=20, sticky="ew")
+        self.status_label = ctk.CTkLabel(self.status_bar_frame, text="Ready. Stay Groovy.", text_color=COLORS["green"])
+        self.status_label.pack(side="left", padx=15)
+        self.progress_bar = ctk.CTkProgressBar(self.status_bar_frame, width=200, progress_color=COLORS["pink"])
+        self.progress_bar.pack(side="right", padx=15, pady=10)
+        self.progress_bar.set(0)
+        if self.engine.store.pending_jobs():
+            self.status_label.configure(text="Ready. The last scan or build didn't finish; run it again to resume.")
+
+    def run_in_thread(self, target_func):
+        thread = threading.Thread(target=target_func)
+        thread.daemon = True
+        thread.start()
+
+    # Worker-side helpers: these only queue work for the main thread.
+    def set_status(self, text):
+        self.ui.post_latest("status", self.status_label.configure, text=text)
+
+    def set_progress(self, value):
+        self.ui.post_latest("progress", self.progress_bar.set, value)
+
+    def report(self, event, **data):
+        # Engine progress, arriving on the worker thread.
+        if event == "status": self.set_status(data["text"])
+        elif event == "progress": self.set_progress(data["value"])
+        elif event == "genres": self.ui.post_latest("genres", self.show_genre_counts, data["counts"], data["tracks"])
+        elif event == "warning": self.set_status(data["message"])   # the engine has also logged it to the profiler
+
+    def start_job(self, name):
+        # One job at a time: a second one would take over the Stop button and reset the first one's trace.
+        if self.job: return None
+        profiler.reset(name)
+        self.job = CancelToken()
+        self.btn_stop.configure(state="normal")
+        self.bg_canvas.set_busy(True)
+        return self.job
+
+    def finish_job(self):
+        self.job = None
+        self.btn_stop.configure(state="disabled")
+        self.bg_canvas.set_busy(False)
+        self.show_profile()
+
+    def stop_job(self):
+        if self.job:
+            self.job.cancel()
+            self.status_label.configure(text="Stopping...")
+
+    def authenticate_spotify(self):
+        try:
+            self.engine.connect()
+        except Exception as e:
+            messagebox.showerror("Auth Error", f"Could not connect.\n{e}")
+            self.destroy()
+
+    def setup_curate_tab(self):
+        self.tab_curate.grid_columnconfigure(0, weight=1)
+        self.tab_curate.grid_rowconfigure(3, weight=1)
+
+        ctrl_frame = ctk.CTkFrame(self.tab_curate, fg_color="transparent")
+        ctrl_frame.grid(row=0, column=0, padx=10, pady=10, sticky="ew")
+        
+        self.btn_scan = ctk.CTkButton(ctrl_frame, text="1. Scan Library", command=self.start_scan_thread,
+                                      fg_color=COLORS["purple"], hover_color=COLORS["pink"], font=("Arial", 14, "bold"))
+        self.btn_scan.pack(side="left", padx=5)
+
+        self.var_playlists = ctk.BooleanVar(value=False)
+        self.chk_playlists = ctk.CTkCheckBox(ctrl_frame, text="+ Playlists", variable=self.var_playlists, width=90,
+                                             text_color=COLORS["green"], fg_color=COLORS["purple"], hover_color=COLORS["pink"])
+        self.chk_playlists.pack(side="left", padx=5)
+
+        self.playlist_name_entry = ctk.CTkEntry(ctrl_frame, placeholder_text="Playlist Name...", width=250,
+                                                fg_color=COLORS["bg"], border_color=COLORS["green"], text_color="white")
+        self.playlist_name_entry.pack(side="left", padx=5, fill="x", expand=True)
+
+        self.btn_create = ctk.CTkButton(ctrl_frame, text="Create Mix", command=self.start_creation_thread, state="disabled",
+                                        fg_color="gray", font=("Arial", 14, "bold"))
+        self.btn_create.pack(side="right", padx=5)
+
+        self.btn_stop = ctk.CTkButton(ctrl_frame, text="Stop", command=self.stop_job, state="disabled", width=60,
+                                      fg_color=COLORS["orange"], hover_color=COLORS["pink"], font=("Arial", 14, "bold"))
+        self.btn_stop.pack(side="right", padx=5)
+
+        filter_frame = ctk.CTkFrame(self.tab_curate, fg_color="transparent")
+        filter_frame.grid(row=1, column=0, padx=10, pady=5, sticky="ew")
+        
+        ctk.CTkLabel(filter_frame, text="Search Genre:", text_color=COLORS["yellow"]).pack(side="left", padx=5)
+        self.search_entry = ctk.CTkEntry(filter_frame, width=150, fg_color=COLORS["bg"], border_color=COLORS["purple"], text_color="white")
+        self.search_entry.pack(side="left", padx=5)
+        self.search_entry.bind("<KeyRelease>", self.on_search)
+
+        self.var_instrumental = ctk.BooleanVar(value=False)
+        self.chk_instrumental = ctk.CTkCheckBox(filter_frame, text="No Lyrics (Read Mode)", variable=self.var_instrumental,
+                                                text_color=COLORS["green"], fg_color=COLORS["purple"], hover_color=COLORS["pink"])
+        self.chk_instrumental.pack(side="left", padx=20)
+
+        self.var_sync = ctk.BooleanVar(value=False)
+        self.chk_sync = ctk.CTkCheckBox(filter_frame, text="Update Existing", variable=self.var_sync,
+                                        text_color=COLORS["green"], fg_color=COLORS["purple"], hover_color=COLORS["pink"])
+        self.chk_sync.pack(side="left", padx=5)
+
+        spice_frame = ctk.CTkFrame(self.tab_curate, fg_color="transparent")
+        spice_frame.grid(row=2, column=0, padx=10, pady=5, sticky="ew")
+        
+        ctk.CTkLabel(spice_frame, text="Discovery Spice:", text_color=COLORS["orange"]).pack(side="left", padx=5)
+        self.lbl_spice = ctk.CTkLabel(spice_frame, text="0%", text_color=COLORS["text"])
+        self.lbl_spice.pack(side="right", padx=10)
+        
+        self.slider_spice = ctk.CTkSlider(spice_frame, from_=0, to=100, number_of_steps=10, command=self.update_spice_label,
+                                          progress_color=COLORS["orange"], button_color=COLORS["green"], button_hover_color=COLORS["yellow"])
+        self.slider_spice.set(0)
+        self.slider_spice.pack(side="left", fill="x", expand=True, padx=10)
+
+        self.genre_list = ScrollableCheckBoxFrame(self.tab_curate, width=500, height=300)
+        self.genre_list.grid(row=3, column=0, padx=10, pady=10, sticky="nsew")
+
+    def setup_stats_tab(self):
+        self.tab_stats.grid_columnconfigure(0, weight=1)
+        ctk.CTkLabel(self.tab_stats, text="Library Stats", font=("Rubik", 20, "bold"), text_color=COLORS["green"]).pack(pady=(20, 10))
+        self.stats_text = ctk.CTkTextbox(self.tab_stats, width=500, height=350, fg_color=COLORS["bg"], text_color="white", border_color=COLORS["purple"], border_width=2)
+        self.stats_text.pack(pady=10, padx=20, fill="both", expand=True)
+
+        perf_header = ctk.CTkFrame(self.tab_stats, fg_color="transparent")
+        perf_header.pack(fill="x", padx=20)
+        ctk.CTkLabel(perf_header, text="Performance", font=("Rubik", 16, "bold"), text_color=COLORS["orange"]).pack(side="left")
+        ctk.CTkButton(perf_header, text="Export Trace", command=self.export_trace, width=110,
+                      fg_color=COLORS["purple"], hover_color=COLORS["pink"]).pack(side="right")
+        self.perf_text = ctk.CTkTextbox(self.tab_stats, width=500, height=220, fg_color=COLORS["bg"], text_color="white", border_color=COLORS["orange"], border_width=2)
+        self.perf_text.pack(pady=10, padx=20, fill="both", expand=True)
+        self.perf_text.insert("0.0", "Run a scan or build to see where the time goes.")
+
+    def show_profile(self):
+        self.perf_text.delete("0.0", "end")
+        self.perf_text.insert("0.0", profiler.summary_text())
+
+    def export_trace(self):
+        # Chrome trace format: open it in chrome://tracing or ui.perfetto.dev.
+        path = filedialog.asksaveasfilename(defaultextension=".json", initialfile="bustcurator-trace.json",
+                                            filetypes=[("Chrome trace", "*.json")])
+        if not path: return
+        try:
+            profiler.export(path)
+            self.status_label.configure(text=f"Trace saved to {os.path.basename(path)}")
+        except Exception as e: messagebox.showerror("Export Error", str(e))
+
+    def update_spice_label(self, value):
+        self.lbl_spice.configure(text=f"{int(value)}%")
+
+    def on_search(self, event=None):
+        self.genre_list.filter_items(self.search_entry.get())
+
+    def start_scan_thread(self):
+        cancel = self.start_job("scan")
+        if not cancel: return
+        self.btn_scan.configure(state="disabled")
+        self.btn_create.configure(state="disabled")
+        self.progress_bar.set(0)
+        playlists = "all" if self.var_playlists.get() else None
+        self.run_in_thread(lambda: self.scan_library(cancel, playlists))
+
+    def scan_library(self, cancel, playlists=None):
+        try:
+            result = self.engine.scan(cancel, self.report, playlists)
+            counts = result["counts"]
+            cache = result["genre_cache"]
+            stats = format_stats(counts, result["tracks"])
+            stats += "\n--- SOURCES ---\n" + "".join(f"• {name} ({n} songs)\n" for name, n in result["sources"].items())
+            stats += (f"\nGenre cache: {cache['hits']} hits, {cache['misses']} misses, "
+                      f"{cache['stale']} stale ({cache['refreshing']} refreshing)\n")
+            self.ui.post(self.show_scan_results, genre_rows(counts), stats)
+
+            # Genres are usable now; warm the audio-features cache so Read Mode builds are local lookups.
+            self.engine.warm_features(cancel, self.report)
+
+            self.set_status(f"Scan complete. Found {sum(1 for c in counts.values() if c >= MIN_GENRE_TRACKS)} main genres.")
+            self.set_progress(1.0)
+        except Cancelled:
+            self.set_status("Scan stopped. Everything fetched so far is saved.")
+        except Exception as e:
+            self.set_status(f"Scan Error: {e}. Scan again to pick up where it stopped.")
+            profiler.mark("error", str(e))
+        finally:
+            self.ui.post(self.finish_scan)
+
+    def show_genre_counts(self, counts, tracks):
+        # Live scan updates: coalesced to one per frame by the dispatcher.
+        self.genre_list.add_items(genre_rows(counts))
+        self.stats_text.delete("0.0", "end")
+        self.stats_text.insert("0.0", format_stats(counts, tracks))
+
+    def show_scan_results(self, rows, stats):
+        self.genre_list.clear_all()
+        self.genre_list.add_items(rows)
+        self.stats_text.delete("0.0", "end")
+        self.stats_text.insert("0.0", stats)
+        self.scanned = True
+
+    def finish_scan(self):
+        # Create Mix waits for the whole scan job, audio-feature warming included.
+        self.finish_job()
+        self.btn_scan.configure(state="normal")
+        if self.scanned: self.btn_create.configure(state="normal", fg_color=COLORS["green"], text_color=COLORS["frame"])
+
+    def start_creation_thread(self):
+        name = self.playlist_name_entry.get()
+        genres = self.genre_list.get_checked_values()
+        spice = self.slider_spice.get()
+        only_inst = self.var_instrumental.get()
+        sync = self.var_sync.get()
+
+        if not name or not genres:
+            messagebox.showwarning("Info", "Please enter a name and pick a genre.")
+            return
+
+        cancel = self.start_job("build")
+        if not cancel: return
+        self.btn_create.configure(state="disabled")
+        self.btn_scan.configure(state="disabled")
+        self.run_in_thread(lambda: self.create_playlist(name, genres, spice, only_inst, cancel, sync))
+
+    def create_playlist(self, name, genres, spice, only_instrumental, cancel, sync=False):
+        try:
+            result = self.engine.build(name, genres, spice, only_instrumental, sync, cancel, self.report)
+            if result["mode"] == "empty":
+                self.ui.post(messagebox.showinfo, "Result", "No songs found after filtering.")
+                return
+            self.set_progress(1.0)
+            if result["mode"] == "synced":
+                plan = result["plan"]
+                self.set_status("Playlist Synced Successfully!")
+                summary = "rewrote it" if plan.rewrite else f"+{len(plan.adds)} / -{len(plan.removes)} tracks, {len(plan.moves)} moves"
+                self.ui.post(messagebox.showinfo, "Groovy!", f"Synced '{name}' ({summary}).")
+            else:
+                self.set_status("Playlist Created Successfully!")
+                self.ui.post(messagebox.showinfo, "Groovy!", f"Created '{name}' with {result['tracks']} tracks.")
+        except Cancelled: self.set_status("Build stopped. Run the same mix again to finish it.")
+        except Exception as e:
+            profiler.mark("error", str(e))
+            self.ui.post(messagebox.showerror, "Error", str(e))
+        finally: self.ui.post(self.finish_creation)
+
+    def finish_creation(self):
+        self.finish_job()
+        self.btn_create.configure(state="normal")
+        self.btn_scan.configure(state="normal")
+        self.progress_bar.set(0)
+
+# --- STARTUP LOGIC ---
+def run():
+    # Check if keys are missing
+    if not os.getenv("SPOTIPY_CLIENT_ID") or not os.getenv("SPOTIPY_CLIENT_SECRET"):
+        # Launch Setup Wizard
+        setup_app = SetupWizard()
+        setup_app.mainloop()
+        
+        # If setup was successful, reload environment and start main app
+        if setup_app.success:
+            load_dotenv(override=True)
+            app = BusTCuratorApp()
+            app.mainloop()
+    else:
+        # Keys exist, launch straight away
+        app = BusTCuratorApp()
+        app.mainloop()
@@ -0,0 +1,84 @@
+from array import array
+
+# --- COMPACT LIBRARY MODEL ---
+# Track ids are interned once into integer slots. Each genre keeps its members either as a
+# bitset (a Python int, when the genre covers a decent slice of the library) or as a sorted
+# array of slots (when it's sparse), so a big library costs bytes per membership, not a list
+# of id strings per genre. Selections OR bitsets together and count with bit_count().
+DENSE_FRACTION = 32   # genres holding more than 1/32 of the library are stored as bitsets
+
+class LibraryModel:
+    def __init__(self):
+        self.track_ids = []   # slot -> track id
+        self.slots = {}       # track id -> slot, while building
+        self.dense = {}       # genre -> int bitset
+        self.sparse = {}      # genre -> sorted array('I') of slots
+        self.counts = {}      # genre -> exact number of distinct tracks
+        self.building = {}    # genre -> array('I') of slots, until freeze()
+
+    @classmethod
+    def build(cls, artist_to_tracks, artist_genres):
+        # artist_to_tracks: {artist_id: [track ids]}, artist_genres: {artist_id: [genres]}
+        model = cls()
+        for aid, genres in artist_genres.items():
+            if genres: model.add(genres, artist_to_tracks.get(aid, ()))
+        model.freeze()
+        model.compact()
+        return model
+
+    def compact(self):
+        # The id -> slot map is only needed while adding tracks; intern() rebuilds it on demand.
+        self.slots = None
+
+    def intern(self, track_id):
+        if self.slots is None: self.slots = {t: i for i, t in enumerate(self.track_ids)}
+        slot = self.slots.get(track_id)
+        if slot is None:
+            slot = self.slots[track_id] = len(self.track_ids)
+            self.track_ids.append(track_id)
+        return slot
+
+    def add(self, genres, track_ids):
+        slots = array("I", (self.intern(t) for t in track_ids))
+        for genre in genres:
+            if genre not in self.building: self.building[genre] = array("I")
+            self.building[genre].extend(slots)
+
+    def freeze(self):
+        # Dedupes each genre's members and picks its storage. Genres already frozen are folded back in first.
+        size = len(self.track_ids)
+        for genre, slots in self.building.items():
+            members = set(slots)
+            if genre in self.sparse: members.update(self.sparse.pop(genre))
+            if genre in self.dense: members.update(self.bits_to_slots(self.dense.pop(genre)))
+            self.counts[genre] = len(members)
+            if len(members) * DENSE_FRACTION > size: self.dense[genre] = self.slots_to_bits(members)
+            else: self.sparse[genre] = array("I", sorted(members))
+        self.building = {}
+
+    def slots_to_bits(self, slots):
+        buf = bytearray((len(self.track_ids) + 7) // 8)
+        for slot in slots: buf[slot >> 3] |= 1 << (slot & 7)
+        return int.from_bytes(buf, "little")
+
+    def bits_to_slots(self, bits):
+        slots = []
+        for byte_pos, byte in enumerate(bits.to_bytes((bits.bit_length() + 7) // 8, "little")):
+            while byte:
+                low = byte & -byte
+                slots.append((byte_pos << 3) + low.bit_length() - 1)
+                byte ^= low
+        return slots
+
+    def selection_bits(self, genres):
+        sparse = [self.sparse[g] for g in genres if g in self.sparse]
+        bits = self.slots_to_bits(slot for arr in sparse for slot in arr) if sparse else 0
+        for g in genres: bits |= self.dense.get(g, 0)
+        return bits
+
+    def select(self, genres):
+        # Distinct track ids across all the given genres.
+        return [self.track_ids[slot] for slot in self.bits_to_slots(self.selection_bits(genres))]
+
+    def genres(self):
+        return sorted(self.counts)
@@ -0,0 +1,89 @@
+import queue
+import threading
+from collections import Counter
+from fetcher import ARTIST_BATCH
+
+# --- STREAMING SCAN PIPELINE ---
+# Track pages are fed in as they arrive; their new artists go straight onto a queue that a
+# resolver thread drains through the genre cache. Genre counts are kept live, so the UI can
+# show genres while pages are still coming in and both phases overlap.
+LOOKUP_BATCH = 500   # artists resolved per genre-cache lookup (misses still go out 50 at a time, in parallel)
+
+class ScanPipeline:
+    def __init__(self, genre_cache, on_update=None, cancel=None):
+        self.genre_cache = genre_cache
+        self.on_update = on_update
+        self.cancel = cancel
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.seen = set()
+        self.artist_tracks = {}
+        self.artist_genres = {}
+        self.requested = set()
+        self.counts = Counter()
+        self.tracks = 0
+        self.error = None
+        self.thread = threading.Thread(target=self.resolve, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def feed(self, pairs):
+        # pairs: (track id, primary artist id). Safe to call from any producer thread.
+        new_artists = []
+        changed = False
+        with self.lock:
+            for track_id, aid in pairs:
+                if not aid or track_id in self.seen: continue
+                self.seen.add(track_id)
+                self.tracks += 1
+                self.artist_tracks.setdefault(aid, []).append(track_id)
+                if aid in self.artist_genres:
+                    self.counts.update(self.artist_genres[aid])
+                    changed = True
+                elif aid not in self.requested:
+                    self.requested.add(aid)
+                    new_artists.append(aid)
+        for i in range(0, len(new_artists), ARTIST_BATCH): self.queue.put(new_artists[i:i+ARTIST_BATCH])
+        if changed: self.emit()
+
+    def feed_rows(self, rows):
+        # rows from store.track_row(); genres hang off each track's first artist.
+        self.feed((r[0], r[3][0]) for r in rows if r and r[3])
+
+    def resolve(self):
+        finished = False
+        while not finished:
+            batch = self.queue.get()
+            if batch is None: break
+            while len(batch) < LOOKUP_BATCH:
+                try: more = self.queue.get_nowait()
+                except queue.Empty: break
+                if more is None:
+                    finished = True
+                    break
+                batch = batch + more
+            if self.error: continue
+            try: genres = self.genre_cache.lookup(batch, cancel=self.cancel)
+            except Exception as e:
+                self.error = e
+                continue
+            with self.lock:
+                for aid in batch:
+                    found = genres.get(aid, [])
+                    self.artist_genres[aid] = found
+                    for genre in found: self.counts[genre] += len(self.artist_tracks.get(aid, ()))
+            self.emit()
+
+    def emit(self):
+        if not self.on_update: return
+        with self.lock: counts, tracks = dict(self.counts), self.tracks
+        self.on_update(counts, tracks)
+
+    def finish(self):
+        # Waits for every queued artist to resolve; returns {artist_id: [genres]}.
+        self.queue.put(None)
+        self.thread.join()
+        if self.error: raise self.error
+        return self.artist_genres
@@ -0,0 +1,109 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# --- PROFILER ---
+# Spans (name, category, start, duration, thread) for the hot paths, plus running counters,
+# for the current job. Categories: "phase" (steps of a scan or build), "fetch" (one page or
+# batch, waits and retries included), "api" (one HTTP call), "wait" (rate limiting) and
+# "ui" (main-loop stalls). summary() feeds Visual Stats; export() writes a Chrome trace
+# (open it in chrome://tracing or ui.perfetto.dev).
+MAX_EVENTS = int(os.getenv("BUSTCURATOR_TRACE_EVENTS", "200000"))   # oldest spans drop off past this
+STALL_MS = 50   # a main-loop frame this late (or this slow) counts as a UI stall
+
+class Profiler:
+    def __init__(self, max_events=MAX_EVENTS):
+        self.lock = threading.Lock()
+        self.max_events = max_events
+        self.reset()
+
+    def reset(self, job=None):
+        with self.lock:
+            self.job = job
+            self.started = time.perf_counter()
+            self.events = deque(maxlen=self.max_events)
+            self.phases = {}     # name -> [category, count, total seconds, max seconds]
+            self.counters = {}
+            self.threads = {}
+            self.problems = []
+
+    @contextmanager
+    def span(self, name, cat="phase", **args):
+        start = time.perf_counter()
+        try: yield
+        finally: self.record(name, cat, start, time.perf_counter() - start, args)
+
+    def record(self, name, cat, start, duration, args=None):
+        thread = threading.current_thread()
+        with self.lock:
+            phase = self.phases.get(name)
+            if phase is None: phase = self.phases[name] = [cat, 0, 0.0, 0.0]
+            phase[1] += 1
+            phase[2] += duration
+            phase[3] = max(phase[3], duration)
+            self.threads[thread.ident] = thread.name
+            self.events.append((name, cat, start, duration, thread.ident, args or None))
+
+    def count(self, name, n=1):
+        with self.lock: self.counters[name] = self.counters.get(name, 0) + n
+
+    def mark(self, name, message):
+        # Something went wrong but the job carried on (or stopped): keep it with the trace.
+        thread = threading.current_thread()
+        with self.lock:
+            self.problems.append(f"{name}: {message}")
+            self.threads[thread.ident] = thread.name
+            self.events.append((name, "problem", time.perf_counter(), None, thread.ident, {"message": message}))
+
+    def summary(self):
+        with self.lock:
+            phases = {name: {"category": cat, "count": n, "total_s": round(total, 3), "max_ms": round(peak * 1000, 1)}
+                      for name, (cat, n, total, peak) in self.phases.items()}
+            counters = dict(self.counters)
+            problems = list(self.problems)
+        def total(cat): return round(sum(p["total_s"] for p in phases.values() if p["category"] == cat), 3)
+        return {"job": self.job, "wall_s": round(time.perf_counter() - self.started, 3), "phases": phases,
+                "counters": counters, "problems": problems, "network_s": total("api"),
+                "rate_limited_s": total("wait"), "ui_stall_s": total("ui")}
+
+    def summary_text(self):
+        s = self.summary()
+        c = s["counters"]
+        stalls = s["phases"].get("ui stall", {})
+        lines = [f"Last job: {s['job'] or '-'} ({s['wall_s']:.1f}s)",
+                 f"Network: {s['network_s']:.1f}s over {c.get('api calls', 0)} calls (summed across workers)",
+                 f"Rate limiting: {s['rate_limited_s']:.1f}s waiting, {c.get('throttled', 0)} × 429, "
+                 f"{c.get('retries', 0)} retries",
+                 f"Transferred: {c.get('bytes in', 0) / 2**20:.2f} MB in, {c.get('bytes out', 0) / 2**20:.2f} MB out",
+                 f"UI: {c.get('ui frames', 0)} frames, {stalls.get('count', 0)} stalls over {STALL_MS} ms"
+                 + (f", worst {stalls['max_ms']:.0f} ms" if stalls else "")]
+        ordered = sorted(s["phases"].items(), key=lambda item: item[1]["total_s"], reverse=True)
+        for title, cats in (("PHASES", ("phase",)), ("FETCHES", ("fetch", "wait", "ui")), ("API CALLS", ("api",))):
+            rows = [f"{name}: {p['count']} × {p['total_s']:.2f}s total, max {p['max_ms']:.0f} ms"
+                    for name, p in ordered if p["category"] in cats]
+            if rows: lines += ["", f"--- {title} ---"] + rows
+        if s["problems"]: lines += ["", "--- PROBLEMS ---"] + s["problems"][-10:]
+        return "\n".join(lines) + "\n"
+
+    def chrome_trace(self):
+        with self.lock:
+            events, threads, started = list(self.events), dict(self.threads), self.started
+        pid = os.getpid()
+        trace = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                 for tid, name in threads.items()]
+        for name, cat, start, duration, tid, args in events:
+            event = {"name": name, "cat": cat, "pid": pid, "tid": tid, "ts": round((start - started) * 1e6, 1)}
+            if duration is None: event.update(ph="i", s="g")
+            else: event.update(ph="X", dur=round(duration * 1e6, 1))
+            if args: event["args"] = args
+            trace.append(event)
+        return {"traceEvents": trace, "displayTimeUnit": "ms", "otherData": self.summary()}
+
+    def export(self, path):
+        with open(path, "w") as f: json.dump(self.chrome_trace(), f)
+        return path
+
+profiler = Profiler()
@@ -0,0 +1,170 @@
+import os
+import random
+import threading
+import time
+import requests
+import spotipy
+from spotipy.exceptions import SpotifyException
+from fetcher import WORKERS, Cancelled, current_cancel
+from profiler import profiler
+
+# --- REQUEST SCHEDULER ---
+# Every Spotify call goes through here: a shared token bucket paces the requests, a 429 pauses
+# *all* threads for Retry-After, and reads get retried with jittered backoff. The pace adapts:
+# it creeps up while calls succeed and halves on every 429, so we run as fast as Spotify allows.
+RATE = float(os.getenv("BUSTCURATOR_RATE", "50"))    # ceiling, requests per second
+START_RATE = 10.0
+MIN_RATE = 1.0
+RATE_STEP = 0.5    # added per successful call (so +1 req/s takes about a fifth of a second at 10 req/s)
+BURST = int(os.getenv("BUSTCURATOR_BURST", "20"))
+MAX_PAUSE_S = float(os.getenv("BUSTCURATOR_MAX_PAUSE", "60"))   # a longer Retry-After fails the job instead
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+
+# Calls that change something on Spotify. They are retried after a 429 (the request was
+# rejected, not applied) but never after a server error, where it may have gone through.
+WRITE_METHODS = {
+    "user_playlist_create", "playlist_add_items", "playlist_remove_all_occurrences_of_items",
+    "playlist_remove_specific_occurrences_of_items", "playlist_reorder_items",
+    "playlist_replace_items", "playlist_change_details",
+}
+
+class RateLimited(Exception):
+    def __init__(self, seconds):
+        super().__init__(f"Spotify asked us to wait {seconds:.0f} seconds before the next request. Try again later.")
+        self.seconds = seconds
+
+def sleep(seconds, cancel=None):
+    # A Stop wakes this up right away instead of after the whole wait.
+    if cancel is None: time.sleep(seconds)
+    elif cancel.event.wait(seconds): raise Cancelled()
+
+class TokenBucket:
+    def __init__(self, rate=RATE, capacity=BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def set_rate(self, rate):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.rate = rate
+
+class RequestScheduler:
+    def __init__(self, rate=RATE, burst=BURST, max_retries=MAX_RETRIES):
+        self.max_rate = rate
+        self.rate = min(START_RATE, rate)
+        self.bucket = TokenBucket(self.rate, burst)
+        self.max_retries = max_retries
+        self.lock = threading.Lock()
+        self.resume_at = 0.0
+        self.slowed_at = 0.0
+        self.calls = 0
+        self.retries = 0
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+    def speed_up(self):
+        with self.lock:
+            if self.rate >= self.max_rate: return
+            self.rate = min(self.max_rate, self.rate + RATE_STEP)
+            rate = self.rate
+        self.bucket.set_rate(rate)
+
+    def pause_all(self, seconds):
+        profiler.count("throttled")
+        with self.lock:
+            now = time.monotonic()
+            # Workers in flight tend to hit the same 429 together; that's one signal, not several.
+            if now >= self.slowed_at:
+                self.rate = max(MIN_RATE, self.rate / 2)
+                self.slowed_at = now + seconds
+            self.resume_at = max(self.resume_at, now + seconds)
+            rate = self.rate
+        self.bucket.set_rate(rate)
+
+    def wait_turn(self, cancel=None):
+        start = time.perf_counter()
+        while True:
+            with self.lock: wait = self.resume_at - time.monotonic()
+            if wait <= 0: break
+            # Hours-long Retry-Afters happen; better to fail (checkpoint kept) than hang every worker.
+            if wait > MAX_PAUSE_S: raise RateLimited(wait)
+            sleep(wait, cancel)
+        self.bucket.acquire()
+        waited = time.perf_counter() - start
+        if waited > 0.001: profiler.record("rate limit", "wait", start, waited)
+
+    def call(self, func, *args, idempotent=True, cancel=None, **kwargs):
+        attempt = 0
+        while True:
+            self.wait_turn(cancel)
+            with self.lock: self.calls += 1
+            profiler.count("api calls")
+            try:
+                with profiler.span(func.__name__, "api"): result = func(*args, **kwargs)
+                self.speed_up()
+                return result
+            except SpotifyException as e:
+                if attempt >= self.max_retries: raise
+                if e.http_status == 429:
+                    retry_after = (e.headers or {}).get("Retry-After")
+                    self.pause_all(float(retry_after) if retry_after else self.backoff(attempt) + 1)
+                elif idempotent and e.http_status >= 500:
+                    sleep(self.backoff(attempt), cancel)
+                else: raise
+            except (requests.ConnectionError, requests.Timeout):
+                if not idempotent or attempt >= self.max_retries: raise
+                sleep(self.backoff(attempt), cancel)
+            attempt += 1
+            profiler.count("retries")
+            with self.lock: self.retries += 1
+
+class ScheduledSpotify:
+    # Drop-in stand-in for spotipy.Spotify that routes every API method through the scheduler,
+    # under the calling thread's cancel token (see fetcher.cancelling).
+    def __init__(self, client, scheduler=None):
+        self.client = client
+        self.scheduler = scheduler or RequestScheduler()
+
+    def __getattr__(self, name):
+        attr = getattr(self.client, name)
+        if not callable(attr) or name.startswith("_"): return attr
+        idempotent = name not in WRITE_METHODS
+        def scheduled(*args, **kwargs):
+            return self.scheduler.call(attr, *args, idempotent=idempotent, cancel=current_cancel(), **kwargs)
+        return scheduled
+
+def count_bytes(response, *args, **kwargs):
+    profiler.count("bytes in", len(response.content))
+    profiler.count("bytes out", len(response.request.url) + len(response.request.body or b""))
+
+def make_client(auth_manager, scheduler=None, prefix=None):
+    # One keep-alive pool sized for the fetch workers; retries are ours, so urllib3's are off.
+    # prefix points the client at another API root (the benchmark's local fake Spotify).
+    session = requests.Session()
+    session.hooks["response"].append(count_bytes)
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max(WORKERS, 10), max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    client = spotipy.Spotify(auth_manager=auth_manager, requests_session=session, retries=0, status_retries=0)
+    if prefix: client.prefix = prefix
+    return ScheduledSpotify(client, scheduler)
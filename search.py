@@ -0,0 +1,84 @@
+# --- SUBSTRING SEARCH INDEX ---
+# Every 1-3 character slice of every item points back at the items containing it, so a
+# short query is one dict lookup and a longer one only checks the items sharing all its trigrams.
+GRAM = 3
+
+class SubstringIndex:
+    def __init__(self, texts=()):
+        self.texts = []
+        self.grams = {}
+        for text in texts: self.add(text)
+
+    def add(self, text):
+        # Returns the new item's position; results always come back in insertion order.
+        pos = len(self.texts)
+        text = text.lower()
+        self.texts.append(text)
+        for n in range(1, GRAM + 1):
+            for i in range(len(text) - n + 1):
+                self.grams.setdefault(text[i:i+n], set()).add(pos)
+        return pos
+
+    def search(self, query):
+        query = query.lower().strip()
+        if not query: return list(range(len(self.texts)))
+        if len(query) <= GRAM: return sorted(self.grams.get(query, ()))
+        candidates = None
+        for i in range(len(query) - GRAM + 1):
+            hits = self.grams.get(query[i:i+GRAM])
+            if not hits: return []
+            candidates = set(hits) if candidates is None else candidates & hits
+            if not candidates: return []
+        return sorted(pos for pos in candidates if query in self.texts[pos])
+
+    def __len__(self):
+        return len(self.texts)
+
+# --- CHECK LIST MODEL ---
+# Everything the genre list knows apart from its widgets: items keyed by value, the search
+# index, which items match the current query (sorted), and which values are checked.
+class CheckList:
+    def __init__(self):
+        self.checked = set()
+        self.query = ""
+        self.clear()
+
+    def clear(self):
+        # Checked values and the search query survive a clear, so a rescan keeps the user's picks
+        # and the list stays filtered to what's in the search box.
+        self.items = []
+        self.positions = {}
+        self.index = SubstringIndex()
+        self.visible = []
+
+    def upsert(self, items):
+        # items: (text, value, search_text). Existing values are just relabelled.
+        added = False
+        for item_text, data_value, search_text in items:
+            pos = self.positions.get(data_value)
+            if pos is not None:
+                self.items[pos]["text"] = item_text
+                continue
+            text = search_text or item_text
+            self.positions[data_value] = self.index.add(text)
+            self.items.append({"value": data_value, "text": item_text, "sort": text.lower()})
+            added = True
+        if added: self.visible = self.matches(self.query)
+        return added
+
+    def matches(self, search_query):
+        return sorted(self.index.search(search_query), key=lambda pos: self.items[pos]["sort"])
+
+    def filter(self, search_query):
+        self.query = search_query
+        self.visible = self.matches(search_query)
+
+    def visible_item(self, row):
+        return self.items[self.visible[row]]
+
+    def set_checked(self, value, checked):
+        if checked: self.checked.add(value)
+        else: self.checked.discard(value)
+
+    def checked_values(self):
+        return [item["value"] for item in self.items if item["value"] in self.checked]
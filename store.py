@@ -0,0 +1,310 @@
+import sqlite3
+import threading
+import json
+import time
+import os
+import sys
+
+# --- LOCAL LIBRARY STORE ---
+# Everything we learn from Spotify lives in one SQLite file next to the app (the .exe when frozen),
+# so a rescan only has to ask for what changed since last time, whichever directory we're run from.
+APP_DIR = os.path.dirname(os.path.abspath(sys.executable if getattr(sys, "frozen", False) else __file__))
+DB_PATH = os.getenv("BUSTCURATOR_DB", os.path.join(APP_DIR, "bustcurator.db"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    id TEXT PRIMARY KEY,
+    added_at TEXT,
+    name TEXT
+);
+CREATE TABLE IF NOT EXISTS track_artists (
+    track_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    artist_id TEXT NOT NULL,
+    PRIMARY KEY (track_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_tracks_added ON tracks(added_at);
+CREATE TABLE IF NOT EXISTS artists (
+    id TEXT PRIMARY KEY,
+    genres TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS playlists (
+    id TEXT PRIMARY KEY,
+    snapshot_id TEXT NOT NULL,
+    tracks TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS audio_features (
+    track_id TEXT PRIMARY KEY,
+    features TEXT,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    job TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    items TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scan_seen (
+    track_id TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS sources (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    snapshot_id TEXT,
+    active INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS track_sources (
+    source TEXT NOT NULL,
+    track_id TEXT NOT NULL,
+    added_at TEXT,
+    PRIMARY KEY (source, track_id)
+);
+CREATE INDEX IF NOT EXISTS idx_track_sources_track ON track_sources(track_id);
+CREATE TABLE IF NOT EXISTS recommendations (
+    seed_key TEXT PRIMARY KEY,
+    tracks TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+"""
+
+# Where tracks come from: Liked Songs, plus any playlists a scan was asked to include (by playlist id).
+# A track in several sources is stored once; track_sources records every source it's in.
+LIKED = "liked"
+ACTIVE = "SELECT id FROM sources WHERE active = 1"
+
+SQL_CHUNK = 500  # stays well under SQLite's bound-parameter limit
+
+def chunked(seq, size):
+    seq = list(seq)
+    for i in range(0, len(seq), size): yield seq[i:i+size]
+
+def track_row(item):
+    # Turns a saved-track (or playlist) item into (key, added_at, name, [artist ids]).
+    # Local files have no id, so we key them by uri to keep counts in step with Spotify's total.
+    # Podcast episodes in playlists aren't music, so they're skipped.
+    t = item.get('track')
+    if not t or t.get('type', 'track') != 'track': return None
+    key = t.get('id') or t.get('uri')
+    if not key: return None
+    artists = [a['id'] for a in t.get('artists') or [] if a.get('id')]
+    return key, item.get('added_at'), t.get('name'), artists
+
+class LibraryStore:
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        # Libraries from before playlist scanning only held Liked Songs.
+        self.conn.execute("INSERT OR IGNORE INTO sources (id, name, active) VALUES (?, 'Liked Songs', 1)", (LIKED,))
+        if not self.conn.execute("SELECT 1 FROM track_sources LIMIT 1").fetchone():
+            self.conn.execute("INSERT INTO track_sources (source, track_id, added_at) SELECT ?, id, added_at FROM tracks", (LIKED,))
+        self.conn.commit()
+
+    def close(self):
+        with self.lock: self.conn.close()
+
+    def track_count(self, source=None):
+        # Tracks in one source, or distinct tracks across the active ones.
+        with self.lock:
+            if source: return self.conn.execute("SELECT COUNT(*) FROM track_sources WHERE source = ?", (source,)).fetchone()[0]
+            return self.conn.execute(f"SELECT COUNT(DISTINCT track_id) FROM track_sources WHERE source IN ({ACTIVE})").fetchone()[0]
+
+    def track_ids(self):
+        # Every track on file, from any source.
+        with self.lock: return {r[0] for r in self.conn.execute("SELECT id FROM tracks")}
+
+    def added_at(self, track_id, source=LIKED):
+        with self.lock:
+            row = self.conn.execute("SELECT added_at FROM track_sources WHERE source = ? AND track_id = ?",
+                                    (source, track_id)).fetchone()
+        return row[0] if row else None
+
+    def upsert_tracks(self, rows, source=LIKED):
+        rows = [r for r in rows if r]
+        if not rows: return
+        with self.lock, self.conn: self.write_tracks(rows, source)
+
+    def write_tracks(self, rows, source):
+        # Caller holds the lock and the transaction.
+        self.conn.executemany("INSERT INTO tracks (id, added_at, name) VALUES (?, ?, ?) "
+                              "ON CONFLICT(id) DO UPDATE SET name = excluded.name",
+                              [(k, added, name) for k, added, name, _ in rows])
+        self.conn.executemany("INSERT OR REPLACE INTO track_sources (source, track_id, added_at) VALUES (?, ?, ?)",
+                              [(source, k, added) for k, added, _, _ in rows])
+        self.conn.executemany("DELETE FROM track_artists WHERE track_id = ?", [(k,) for k, _, _, _ in rows])
+        self.conn.executemany("INSERT INTO track_artists (track_id, position, artist_id) VALUES (?, ?, ?)",
+                              [(k, pos, aid) for k, _, _, artists in rows for pos, aid in enumerate(artists)])
+
+    def prune_tracks(self):
+        # Drops tracks no source holds any more. Caller holds the lock and the transaction.
+        self.conn.execute("DELETE FROM track_artists WHERE track_id NOT IN (SELECT track_id FROM track_sources)")
+        self.conn.execute("DELETE FROM tracks WHERE id NOT IN (SELECT track_id FROM track_sources)")
+
+    def primary_artists(self):
+        # {artist_id: [track ids]} for tracks in the active sources, using each track's first artist,
+        # which is what genres hang off.
+        artist_to_tracks = {}
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT track_id, artist_id FROM track_artists WHERE position = 0 AND track_id IN "
+                f"(SELECT track_id FROM track_sources WHERE source IN ({ACTIVE}))").fetchall()
+        for tid, aid in rows: artist_to_tracks.setdefault(aid, []).append(tid)
+        return artist_to_tracks
+
+    # --- SOURCES ---
+    def sources(self):
+        # {source id: (name, snapshot_id, active)}
+        with self.lock:
+            return {sid: (name, snapshot, bool(active))
+                    for sid, name, snapshot, active in self.conn.execute("SELECT id, name, snapshot_id, active FROM sources")}
+
+    def source_counts(self):
+        # {source name: tracks} for the active sources, Liked Songs first.
+        with self.lock:
+            return dict(self.conn.execute(
+                "SELECT s.name, COUNT(ts.track_id) FROM sources s LEFT JOIN track_sources ts ON ts.source = s.id "
+                "WHERE s.active = 1 GROUP BY s.id ORDER BY s.id != ?, s.name", (LIKED,)))
+
+    def set_active_sources(self, source_ids):
+        # Which playlists the library is built from; Liked Songs always counts. Inactive sources keep
+        # their tracks on file, so switching them back on doesn't refetch anything that hasn't changed.
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE sources SET active = 0 WHERE id != ?", (LIKED,))
+            self.conn.executemany("UPDATE sources SET active = 1 WHERE id = ?", [(sid,) for sid in source_ids])
+
+    def replace_source(self, source_id, name, snapshot_id, rows, active=True):
+        # A playlist's full contents as of snapshot_id.
+        rows = [r for r in rows if r]
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO sources (id, name, snapshot_id, active) VALUES (?, ?, ?, ?)",
+                              (source_id, name, snapshot_id, int(active)))
+            self.conn.execute("DELETE FROM track_sources WHERE source = ?", (source_id,))
+            if rows: self.write_tracks(rows, source_id)
+            self.prune_tracks()
+
+    def remove_source(self, source_id):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM track_sources WHERE source = ?", (source_id,))
+            self.conn.execute("DELETE FROM sources WHERE id = ?", (source_id,))
+            self.prune_tracks()
+
+    def artist_genres(self, artist_ids):
+        # {artist_id: (genres, fetched_at)} for the ids we have on file.
+        found = {}
+        with self.lock:
+            for chunk in chunked(artist_ids, SQL_CHUNK):
+                marks = ",".join("?" * len(chunk))
+                for aid, genres, fetched_at in self.conn.execute(
+                        f"SELECT id, genres, fetched_at FROM artists WHERE id IN ({marks})", chunk):
+                    found[aid] = (json.loads(genres), fetched_at)
+        return found
+
+    def save_artist_genres(self, artists):
+        now = time.time()
+        rows = [(a['id'], json.dumps(a.get('genres') or []), now) for a in artists if a and a.get('id')]
+        if not rows: return
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO artists (id, genres, fetched_at) VALUES (?, ?, ?)", rows)
+
+    def audio_features(self, track_ids):
+        # {track_id: feature dict, or None when Spotify has no features for it} for tracks on file.
+        found = {}
+        with self.lock:
+            for chunk in chunked(track_ids, SQL_CHUNK):
+                marks = ",".join("?" * len(chunk))
+                for tid, features in self.conn.execute(
+                        f"SELECT track_id, features FROM audio_features WHERE track_id IN ({marks})", chunk):
+                    found[tid] = json.loads(features) if features else None
+        return found
+
+    def save_audio_features(self, features):
+        # features: {track_id: dict or None}
+        now = time.time()
+        rows = [(tid, json.dumps(f) if f else None, now) for tid, f in features.items()]
+        if not rows: return
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO audio_features (track_id, features, fetched_at) VALUES (?, ?, ?)", rows)
+
+    def tracks_without_features(self):
+        # Library tracks we've never asked about; local files (keyed by uri) have no features to ask for.
+        with self.lock:
+            return [r[0] for r in self.conn.execute(
+                "SELECT t.id FROM tracks t LEFT JOIN audio_features f ON f.track_id = t.id "
+                "WHERE f.track_id IS NULL AND t.id NOT LIKE 'spotify:%'")]
+
+    def playlist_contents(self, playlist_id):
+        # (snapshot_id, [track keys]) as of the last time we read or wrote the playlist, or (None, None).
+        with self.lock:
+            row = self.conn.execute("SELECT snapshot_id, tracks FROM playlists WHERE id = ?", (playlist_id,)).fetchone()
+        return (row[0], json.loads(row[1])) if row else (None, None)
+
+    def save_playlist_contents(self, playlist_id, snapshot_id, track_keys):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO playlists (id, snapshot_id, tracks) VALUES (?, ?, ?)",
+                              (playlist_id, snapshot_id, json.dumps(track_keys)))
+
+    def recommendations(self, seed_keys, max_age):
+        # {seed_key: [track ids]} for seed groups asked about less than max_age seconds ago.
+        found = {}
+        cutoff = time.time() - max_age
+        with self.lock:
+            for chunk in chunked(seed_keys, SQL_CHUNK):
+                marks = ",".join("?" * len(chunk))
+                for key, tracks in self.conn.execute(
+                        f"SELECT seed_key, tracks FROM recommendations WHERE seed_key IN ({marks}) AND fetched_at >= ?",
+                        chunk + [cutoff]):
+                    found[key] = json.loads(tracks)
+        return found
+
+    def save_recommendations(self, results):
+        # results: {seed_key: [track ids]}
+        now = time.time()
+        rows = [(key, json.dumps(tracks), now) for key, tracks in results.items()]
+        if not rows: return
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO recommendations (seed_key, tracks, fetched_at) VALUES (?, ?, ?)", rows)
+
+    # --- JOB CHECKPOINTS ---
+    # An unfinished scan or build leaves its progress here, so the next run picks up where it stopped.
+    def checkpoint(self, job):
+        # (state, items) saved by an unfinished job, or (None, None).
+        with self.lock:
+            row = self.conn.execute("SELECT state, items FROM checkpoints WHERE job = ?", (job,)).fetchone()
+        return (json.loads(row[0]), json.loads(row[1]) if row[1] else None) if row else (None, None)
+
+    def save_checkpoint(self, job, state, items=None):
+        # items (a big list) is written once; later saves without it keep what's there, so they stay small.
+        with self.lock, self.conn:
+            self.conn.execute("INSERT INTO checkpoints (job, state, items, updated_at) VALUES (?, ?, ?, ?) "
+                              "ON CONFLICT(job) DO UPDATE SET state = excluded.state, "
+                              "items = COALESCE(excluded.items, items), updated_at = excluded.updated_at",
+                              (job, json.dumps(state), json.dumps(items) if items is not None else None, time.time()))
+
+    def clear_checkpoint(self, job):
+        with self.lock, self.conn: self.conn.execute("DELETE FROM checkpoints WHERE job = ?", (job,))
+
+    def pending_jobs(self):
+        with self.lock: return [r[0] for r in self.conn.execute("SELECT job FROM checkpoints ORDER BY updated_at")]
+
+    def mark_seen(self, track_ids):
+        # Tracks seen by the current full pass; whatever it didn't see is gone from Liked Songs.
+        rows = [(t,) for t in track_ids]
+        if not rows: return
+        with self.lock, self.conn: self.conn.executemany("INSERT OR IGNORE INTO scan_seen (track_id) VALUES (?)", rows)
+
+    def clear_seen(self):
+        with self.lock, self.conn: self.conn.execute("DELETE FROM scan_seen")
+
+    def remove_unseen(self, source=LIKED):
+        # Ends a full pass: drops the tracks it didn't see from the source and resets the seen list.
+        # Returns how many went.
+        with self.lock, self.conn:
+            removed = self.conn.execute("DELETE FROM track_sources WHERE source = ? AND track_id NOT IN "
+                                        "(SELECT track_id FROM scan_seen)", (source,)).rowcount
+            self.conn.execute("DELETE FROM scan_seen")
+            self.prune_tracks()
+        return removed
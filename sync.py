@@ -0,0 +1,145 @@
+# --- PLAYLIST SYNC ---
+# Instead of creating a fresh playlist every run, work out the smallest set of removes, adds
+# and moves that turn the playlist's current contents into the new mix, and send only those.
+# Contents are cached per snapshot_id, so an untouched playlist isn't even re-read.
+WRITE_BATCH = 100
+
+def track_key(item):
+    t = item.get('track')
+    return (t.get('id') or t.get('uri')) if t else None
+
+def is_local(key):
+    return key.startswith("spotify:local:")
+
+def merge_order(current, wanted):
+    # Target order for a sync: tracks that stay keep their current order, new ones go on the end
+    # in the order given. Local files can't be re-added through the API, so they're always kept.
+    wanted_set = set(wanted)
+    kept, seen = [], set()
+    for key in current:
+        if (key in wanted_set or is_local(key)) and key not in seen:
+            kept.append(key)
+            seen.add(key)
+    return kept + [key for key in wanted if key not in seen]
+
+def longest_increasing(seq):
+    # Positions in seq forming a longest strictly increasing run (patience sorting).
+    tails, tail_pos, prev = [], [], [None] * len(seq)
+    for i, value in enumerate(seq):
+        lo, hi = 0, len(tails)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if tails[mid] < value: lo = mid + 1
+            else: hi = mid
+        prev[i] = tail_pos[lo - 1] if lo else None
+        if lo == len(tails):
+            tails.append(value)
+            tail_pos.append(i)
+        else:
+            tails[lo] = value
+            tail_pos[lo] = i
+    keep, i = set(), tail_pos[-1] if tail_pos else None
+    while i is not None:
+        keep.add(i)
+        i = prev[i]
+    return keep
+
+def apply_moves(items, moves):
+    order = list(items)
+    for start, insert_before in moves: order.insert(insert_before - (start < insert_before), order.pop(start))
+    return order
+
+def reorder_moves(current, target):
+    # Single-item moves (range_start, insert_before) that turn current into target. Tracks on the
+    # longest run already in target order stay put; every other track goes right after its
+    # predecessor in target, so the number of moves is len - LIS, the fewest possible.
+    rank = {key: i for i, key in enumerate(target)}
+    anchors = {current[i] for i in longest_increasing([rank[key] for key in current])}
+    order = list(current)
+    moves = []
+    for i, key in enumerate(target):
+        if key in anchors: continue
+        start = order.index(key)
+        insert_before = order.index(target[i - 1]) + 1 if i else 0
+        if start == insert_before or start + 1 == insert_before: continue
+        moves.append((start, insert_before))
+        order.insert(insert_before - (start < insert_before), order.pop(start))
+    return moves
+
+class SyncPlan:
+    def __init__(self, current, target):
+        target_set = set(target)
+        counts = {}
+        for key in current: counts[key] = counts.get(key, 0) + 1
+        # Strays and duplicates are cleared out entirely (duplicates get added back once below).
+        self.removes = [key for key, n in counts.items() if not is_local(key) and (key not in target_set or n > 1)]
+        removed = set(self.removes)
+        remaining = [key for key in current if key not in removed]
+        remaining_set = set(remaining)
+        self.adds = [key for key in target if key not in remaining_set]
+        self.moves = reorder_moves(remaining + self.adds, target)
+        self.target = target
+        # What the playlist holds once the plan is applied. Usually target, but not when a local
+        # file appears twice: it can't be removed, so both copies stay.
+        self.result = apply_moves(remaining + self.adds, self.moves)
+        # When the reshuffle costs more than rewriting the whole playlist, rewrite it instead
+        # (unless that would drop local files, which can only be moved).
+        self.rewrite = (len(self.moves) + batches(self.removes) + batches(self.adds) > batches(target) + 1
+                        and not any(is_local(key) for key in target))
+
+    def requests(self):
+        if self.rewrite: return max(batches(self.target), 1)
+        return batches(self.removes) + batches(self.adds) + len(self.moves)
+
+def batches(items):
+    return (len(items) + WRITE_BATCH - 1) // WRITE_BATCH
+
+class PlaylistSync:
+    def __init__(self, sp, fetcher, store):
+        self.sp = sp
+        self.fetcher = fetcher
+        self.store = store
+
+    def read(self, playlist_id, cancel=None):
+        snapshot_id = self.sp.playlist(playlist_id, fields="snapshot_id")['snapshot_id']
+        cached_snapshot, keys = self.store.playlist_contents(playlist_id)
+        if cached_snapshot == snapshot_id: return snapshot_id, keys
+        keys = [k for k in map(track_key, self.fetcher.playlist_tracks(playlist_id, cancel=cancel)) if k]
+        self.store.save_playlist_contents(playlist_id, snapshot_id, keys)
+        return snapshot_id, keys
+
+    def find(self, owner_id, name, cancel=None):
+        # Id of the user's own playlist called `name`, if there is one.
+        for playlist in self.fetcher.playlists(cancel=cancel):
+            if playlist and playlist['name'] == name and playlist['owner']['id'] == owner_id: return playlist['id']
+        return None
+
+    def sync(self, playlist_id, wanted, on_progress=None, cancel=None):
+        # Makes the playlist hold exactly `wanted` (plus any local files); returns the plan that was applied.
+        snapshot_id, current = self.read(playlist_id, cancel)
+        target = merge_order(current, wanted)
+        plan = SyncPlan(current, target)
+        total, done = plan.requests(), 0
+        def step(result):
+            nonlocal snapshot_id, done
+            if cancel: cancel.check()
+            snapshot_id = (result or {}).get('snapshot_id', snapshot_id)
+            done += 1
+            if on_progress: on_progress(done, total)
+
+        if plan.rewrite:
+            step(self.sp.playlist_replace_items(playlist_id, target[:WRITE_BATCH]))
+            for i in range(WRITE_BATCH, len(target), WRITE_BATCH):
+                step(self.sp.playlist_add_items(playlist_id, target[i:i+WRITE_BATCH]))
+        else:
+            for i in range(0, len(plan.removes), WRITE_BATCH):
+                step(self.sp.playlist_remove_all_occurrences_of_items(
+                    playlist_id, plan.removes[i:i+WRITE_BATCH], snapshot_id=snapshot_id))
+            for i in range(0, len(plan.adds), WRITE_BATCH):
+                step(self.sp.playlist_add_items(playlist_id, plan.adds[i:i+WRITE_BATCH]))
+            for start, insert_before in plan.moves:
+                step(self.sp.playlist_reorder_items(playlist_id, start, insert_before, snapshot_id=snapshot_id))
+        # Cache what we wrote only if it's exactly what the playlist now holds; otherwise read it back.
+        if plan.rewrite or plan.result == target: self.store.save_playlist_contents(playlist_id, snapshot_id, target)
+        else: self.read(playlist_id, cancel)
+        return plan
@@ -0,0 +1,93 @@
+import random
+import pytest
+from sync import longest_increasing, reorder_moves, apply_moves, merge_order, SyncPlan, PlaylistSync
+
+def is_increasing_run(seq, positions):
+    values = [seq[i] for i in sorted(positions)]
+    return all(a < b for a, b in zip(values, values[1:]))
+
+def brute_lis(seq):
+    best = [1] * len(seq)
+    for i in range(len(seq)):
+        for j in range(i):
+            if seq[j] < seq[i]: best[i] = max(best[i], best[j] + 1)
+    return max(best, default=0)
+
+@pytest.mark.parametrize("seq", [[], [1], [3, 2, 1], [1, 2, 3], [2, 2, 2], [5, 1, 4, 2, 3, 6]])
+def test_longest_increasing_small(seq):
+    keep = longest_increasing(seq)
+    assert len(keep) == brute_lis(seq)
+    assert is_increasing_run(seq, keep)
+
+def test_longest_increasing_random():
+    rng = random.Random(1)
+    for _ in range(300):
+        seq = [rng.randrange(20) for _ in range(rng.randrange(15))]
+        keep = longest_increasing(seq)
+        assert len(keep) == brute_lis(seq)
+        assert is_increasing_run(seq, keep)
+
+def test_reorder_moves_reaches_target_in_fewest_moves():
+    rng = random.Random(2)
+    for _ in range(500):
+        current = [f"t{i}" for i in range(rng.randrange(30))]
+        target = rng.sample(current, len(current))
+        moves = reorder_moves(current, target)
+        assert apply_moves(current, moves) == target
+        rank = {key: i for i, key in enumerate(target)}
+        assert len(moves) <= len(current) - brute_lis([rank[key] for key in current])
+
+def test_reorder_moves_nothing_to_do():
+    assert reorder_moves(["a", "b", "c"], ["a", "b", "c"]) == []
+
+def test_merge_order_keeps_current_order_and_local_files():
+    current = ["b", "spotify:local:x", "a", "gone"]
+    assert merge_order(current, ["a", "b", "new"]) == ["b", "spotify:local:x", "a", "new"]
+
+def test_sync_plan_result_matches_target():
+    rng = random.Random(3)
+    pool = [f"t{i}" for i in range(40)] + ["spotify:local:x", "spotify:local:y"]
+    for _ in range(500):
+        current = [rng.choice(pool) for _ in range(rng.randrange(25))]
+        # Each local file at most once: a repeated one can't be removed (see below).
+        current = [k for i, k in enumerate(current) if not k.startswith("spotify:local:") or k not in current[:i]]
+        target = merge_order(current, rng.sample(pool[:40], rng.randrange(20)))
+        plan = SyncPlan(current, target)
+        assert plan.result == target
+
+def test_sync_plan_duplicate_local_file_cannot_reach_target():
+    current = ["spotify:local:x", "a", "spotify:local:x"]
+    plan = SyncPlan(current, merge_order(current, ["a"]))
+    assert plan.target == ["spotify:local:x", "a"]
+    assert plan.result == current
+    assert plan.requests() == 0
+
+def test_sync_plan_rewrites_when_cheaper():
+    current = [f"t{i}" for i in range(50)]
+    plan = SyncPlan(current, list(reversed(current)))
+    assert plan.rewrite
+    assert plan.requests() == 1
+    assert not SyncPlan(current + ["spotify:local:x"], list(reversed(current)) + ["spotify:local:x"]).rewrite
+
+class FakeSpotify:
+    def __init__(self, snapshot_id): self.snapshot_id = snapshot_id
+    def playlist(self, playlist_id, fields=None): return {"snapshot_id": self.snapshot_id}
+
+class FakeFetcher:
+    def __init__(self, keys): self.keys, self.reads = keys, 0
+    def playlist_tracks(self, playlist_id, cancel=None):
+        self.reads += 1
+        return [{"track": {"id": None, "uri": key}} if key.startswith("spotify:local:") else {"track": {"id": key}}
+                for key in self.keys]
+
+class FakeStore:
+    def __init__(self): self.contents = {}
+    def playlist_contents(self, playlist_id): return self.contents.get(playlist_id, (None, []))
+    def save_playlist_contents(self, playlist_id, snapshot_id, keys): self.contents[playlist_id] = (snapshot_id, keys)
+
+def test_sync_keeps_cache_true_to_playlist_with_duplicate_local_file():
+    current = ["spotify:local:x", "a", "spotify:local:x"]
+    store, fetcher = FakeStore(), FakeFetcher(current)
+    plan = PlaylistSync(FakeSpotify("s1"), fetcher, store).sync("p", ["a"])
+    assert plan.requests() == 0
+    assert store.contents["p"] == ("s1", current)